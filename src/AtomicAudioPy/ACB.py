@@ -1,6 +1,9 @@
 import array
-import os
+import concurrent.futures
+import contextlib
 import hashlib
+import mmap
+import os
 import struct
 
 from enum import Enum
@@ -9,28 +12,35 @@ from io import BytesIO
 from UTFAFS import *
 from ADX import ADX
 from HCA import HCA
+from WAVE import WAVE
 
 
 class ACB:
 
-	def __init__(self, acbPath, awbPath=None):
+	def __init__(self, acbPath, awbPath=None, mapped=None, columnar=False, lazy=True):
 
 		self.AcbPath = acbPath
 		self.AwbPath = awbPath
 
-		with open(self.AcbPath, "rb") as f:
-			self.AcbBytes = f.read()
-			self.AcbStruct = UTF()
-			self.AcbStruct.frombytes(self.AcbBytes)
+		# when mapped, parsed entries are views into the file rather than copies of it;
+		# Write (and write_right) can still go back over the same files, since those
+		# are swapped in for the old ones rather than written over them. Windows won't
+		# swap out a file that is still mapped, so files aren't mapped there by default
+		if mapped is None:
+			mapped = os.name != "nt"
+		# when lazy, tables (and the in-memory AWB) are only parsed once something looks at them
+		self.AcbStruct = ReadStruct(UTF(columnar=columnar, lazy=lazy), self.AcbPath, mapped)
 
+		# the AWB hash in the ACB gets recomputed while the AWB is being written
+		self.StreamAwbHashStale = False
+		# layout fixups that are being held back until the end of a batch
+		self.BatchDepth = 0
+		self.PendingStreamLayout = False
+		self.PendingAcbLayout = False
 		if self.AwbPath is None:
-			self.AwbBytes = None
 			self.StreamAwbStruct = None
 		else:
-			with open(self.AwbPath, "rb") as f:
-				self.AwbBytes = f.read()
-				self.StreamAwbStruct = AFS2()
-				self.StreamAwbStruct.frombytes(self.AwbBytes)
+			self.StreamAwbStruct = ReadStruct(AFS2(lazy=True), self.AwbPath, mapped)
 
 		self.AcfCategories = dict()
 		for i in range(self.AcbStruct.GetRowField(0, "AcfReferenceTable").Value.Value.RowCount):
@@ -43,6 +53,8 @@ class ACB:
 		vstring = ".".join(["{:x}".format((version >> 8*i) & 0xFF) for i in reversed(range(4))])
 
 		self.Tables = dict()
+		# parsed command lists, by (table name, row)
+		self.CommandCache = dict()
 
 		# compatibility
 		for shortTableName in ["TrackEvent", "TrackCommand", "SynthCommand", "SeqCommand"]:
@@ -69,9 +81,9 @@ class ACB:
 				storedAwbHash = self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value.GetRowField(0, "Hash").Value.Value
 			else:
 				storedAwbHash = self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value
-			trueAwbHash = hashlib.md5(self.AwbBytes)
 			# ACE-created ACBs fail this lol. sad!
-			#assert storedAwbHash == array.array("B", trueAwbHash.digest())
+			#with open(self.AwbPath, "rb") as f:
+			#	assert storedAwbHash == array.array("B", hashlib.file_digest(f, "md5").digest())
 			if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value is not None:
 				if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Magic == b"@UTF":
 					self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.GetRowField(0, "Header").Value.Value.check_equal(self.StreamAwbStruct)
@@ -85,8 +97,6 @@ class ACB:
 		else:
 			raise ValueError(f"Unknown ACB version: {vstring}")
 
-		self.MemoryAwbStruct = self.AcbStruct.GetRowField(0, "AwbFile").Value.Value
-
 		self.CueId2CueNameRow = dict()
 		self.CueId2CueRow = dict()
 		for i in range(self.Tables["CueName"].RowCount):
@@ -119,20 +129,67 @@ class ACB:
 					self.MemoryAwbId2WaveformRow[awbId] = set()
 				self.MemoryAwbId2WaveformRow[awbId].add(j)
 
-	def RefreshHash(self):
+		self.Graph = CueGraph(self)
+
+	@property
+	def MemoryAwbStruct(self):
+		return self.AcbStruct.GetRowField(0, "AwbFile").Value.Value
+
+	def RefreshHash(self, awbHash=None):
 		#if self.AwbPath is not None:
 		if self.StreamAwbStruct is not None:
-			# get offsets correct before getting actual bytes
-			self.StreamAwbStruct.update_offsets()
+			if awbHash is None:
+				# get offsets correct before hashing
+				self.StreamAwbStruct.update_offsets()
+				awbHash = self.StreamAwbStruct.todigest(hashlib.md5())
 			if self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Magic == b"@UTF":
-				self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value.GetRowField(0, "Hash").Value.Value = array.array("B", hashlib.md5(self.StreamAwbStruct.tobytes()).digest())
-				storedAwbHash = self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value.GetRowField(0, "Hash").Value.Value
+				self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value.GetRowField(0, "Hash").Value.Value = array.array("B", awbHash.digest())
+				self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value.MarkDirty()
 			else:
-				self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value = array.array("B", hashlib.md5(self.StreamAwbStruct.tobytes()).digest())
-				storedAwbHash = self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value
-			self.AwbBytes = self.StreamAwbStruct.tobytes()
-			trueAwbHash = hashlib.md5(self.AwbBytes)
-			assert storedAwbHash == array.array("B", trueAwbHash.digest())
+				self.AcbStruct.GetRowField(0, "StreamAwbHash").Value.Value = array.array("B", awbHash.digest())
+				self.AcbStruct.MarkDirty()
+			self.StreamAwbHashStale = False
+
+	@contextlib.contextmanager
+	def Batch(self):
+		# edits made inside go in as usual, but offsets and the AWB header copy only get redone once, on the way out
+		self.BatchDepth += 1
+		try:
+			yield self
+		finally:
+			self.BatchDepth -= 1
+			self.UpdateLayout(streaming=False, acb=False)
+
+	def UpdateLayout(self, streaming, acb=True):
+		if streaming:
+			self.PendingStreamLayout = True
+			self.StreamAwbHashStale = True
+		if acb:
+			self.PendingAcbLayout = True
+		if self.BatchDepth:
+			return
+		if self.PendingStreamLayout:
+			self.StreamAwbStruct.update_offsets()
+			if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value is not None:
+				if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Magic == b"@UTF":
+					self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.GetRowField(0, "Header").Value.Value.set_equal(self.StreamAwbStruct)
+				else:
+					self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.set_equal(self.StreamAwbStruct)
+		if self.PendingAcbLayout:
+			self.AcbStruct.update_offsets()
+		self.PendingStreamLayout = False
+		self.PendingAcbLayout = False
+
+	def Write(self, acbPath, awbPath=None):
+		if self.StreamAwbStruct is not None and awbPath is not None:
+			# the AWB goes first so that its hash can be taken on the way out
+			awbHash = hashlib.md5() if self.StreamAwbHashStale else None
+			self.StreamAwbStruct.write_right(awbPath, awbHash)
+			if awbHash is not None:
+				self.RefreshHash(awbHash)
+		elif self.StreamAwbHashStale:
+			self.RefreshHash()
+		self.AcbStruct.write_right(acbPath)
 
 	def PrettyPrint(self):
 		for cueId in sorted(self.CueId2CueNameRow):
@@ -149,40 +206,42 @@ class ACB:
 			self.RecursivelyGetReferences(refType, refIndex, depth=1, ind=0, printing=True, extracting=False)
 			print()
 
-	def RecursivelyGetReferences(self, refType, refIndex, depth=0, ind=0, printing=False, keycode=None, outputFormat=None, path="", extracting=False):
+	def GetCueWaveforms(self, cueId):
+		return self.Graph.CueWaveforms(self.CueId2CueRow[cueId])
+
+	def GetAwbIdCues(self, awbId, streaming):
+		mapper = self.StreamAwbId2WaveformRow if streaming else self.MemoryAwbId2WaveformRow
+		cueRows = set()
+		for waveRow in mapper.get(awbId, ()):
+			cueRows |= self.Graph.WaveformCues(waveRow)
+		return sorted(self.Tables["Cue"].GetRowField(cueRow, "CueId").Value for cueRow in cueRows)
+
+	def GetCommands(self, tableName, row):
+		if (tableName, row) not in self.CommandCache:
+			self.CommandCache[(tableName, row)] = ParseCommands(self.Tables[tableName].GetRowField(row, "Command").Value.Value, CommandFormats[tableName])
+		return self.CommandCache[(tableName, row)]
+
+	def RecursivelyGetReferences(self, refType, refIndex, depth=0, ind=0, printing=False, keycode=None, outputFormat=None, path="", extracting=False, tasks=None):
 		if ReferenceType(refType) == ReferenceType.Waveform:
-			streaming = self.Tables["Waveform"].GetRowField(refIndex, "Streaming").Value
-			encodeType = self.Tables["Waveform"].GetRowField(refIndex, "EncodeType").Value
-			extIndex = self.Tables["Waveform"].GetRowField(refIndex, "ExtensionData").Value
-			if streaming:
-				awb = self.StreamAwbStruct
-				if self.SimpleAwbId:
-					awbId = self.Tables["Waveform"].GetRowField(refIndex, "Id").Value
-				else:
-					assert self.Tables["Waveform"].GetRowField(refIndex, "MemoryAwbId").Value == 65535
-					awbId = self.Tables["Waveform"].GetRowField(refIndex, "StreamAwbId").Value
-			else:
-				awb = self.MemoryAwbStruct
-				if self.SimpleAwbId:
-					awbId = self.Tables["Waveform"].GetRowField(refIndex, "Id").Value
-				else:
-					assert self.Tables["Waveform"].GetRowField(refIndex, "StreamAwbId").Value == 65535
-					awbId = self.Tables["Waveform"].GetRowField(refIndex, "MemoryAwbId").Value
+			streaming, awbId, encodeType = self.Graph.Waveforms[refIndex]
+			awb = self.StreamAwbStruct if streaming else self.MemoryAwbStruct
 			#assert awb is not None
 			audio = None
-			if awb is not None:
+			# the audio itself only gets parsed here for printing; extraction reads it again on its own
+			if awb is not None and printing:
 				if EncodeExt[encodeType] == "ADX":
 					audio = ADX()
 					audio.frombytes(awb.EntryData[awb.IdToInd[awbId]])
 				elif EncodeExt[encodeType] == "HCA":
 					audio = HCA()
-					audio.frombytes(awb.EntryData[awb.IdToInd[awbId]])
+					audio.frombytes(awb.EntryData[awb.IdToInd[awbId]], headerOnly=True)
 			if printing:
 				print("{}Waveform from {} AWB".format(" "*depth, "Streaming" if streaming else "Memory"))
 				print("{}ID: {}".format(" "*(depth+1), awbId))
 				print("{}Type: {}".format(" "*(depth+1), EncodeExt[encodeType]))
 				print("{}Channels: {}".format(" "*(depth+1), self.Tables["Waveform"].GetRowField(refIndex, "NumChannels").Value))
 				print("{}Loop: {}".format(" "*(depth+1), self.Tables["Waveform"].GetRowField(refIndex, "LoopFlag").Value))
+				extIndex = self.Tables["Waveform"].GetRowField(refIndex, "ExtensionData").Value
 				if extIndex != 0xFFFF:
 					print("{}Loop Start: {}".format(" "*(depth+2), self.Tables["WaveformExtensionData"].GetRowField(extIndex, "LoopStart").Value))
 					print("{}Loop End: {}".format(" "*(depth+2), self.Tables["WaveformExtensionData"].GetRowField(extIndex, "LoopEnd").Value))
@@ -198,21 +257,9 @@ class ACB:
 					print("{}Sampling Rate: {}".format(" "*(depth+2), audio.SampleRate))
 					print("{}Samples: {}".format(" "*(depth+2), audio.SampleCount))
 			if extracting:
-				if outputFormat is not None:
-					output_ext = outputFormat
-				else:
-					output_ext = EncodeExt[encodeType]
-				filename = f"{path}.{output_ext}"
-				if audio is not None:
-					if keycode is not None:
-						if EncodeExt[encodeType] == "ADX":
-							audio.decrypt(keycode)
-						elif EncodeExt[encodeType] == "HCA":
-							audio.Crypt(keycode * ((awb.Key << 16) | ((~awb.Key + 2) + 2**16)))
-					audio.write_right(filename)
-				elif awb is not None:
-					with open(filename, "wb") as f:
-						f.write(awb.EntryData[awbId])
+				filename, task = self.ExtractionTask(awb, awbId, encodeType, path, keycode, outputFormat)
+				if task is not None:
+					tasks.append(task)
 				else:
 					print("{}Matching AWB not found; skipping extraction for {}.".format(" "*(depth+3) if printing else "", filename))
 		elif ReferenceType(refType) == ReferenceType.Synth or ReferenceType(refType) == ReferenceType.LinkedSynth:
@@ -227,22 +274,17 @@ class ACB:
 						print("{}{}".format(" "*(depth+2), globalAisacName))
 				cmdIndex = self.Tables["Synth"].GetRowField(refIndex, "CommandIndex").Value
 				if cmdIndex != 0xFFFF:
-					cmdBytes = list(self.Tables["SynthCommand"].GetRowField(cmdIndex, "Command").Value.Value)
 					print("{}Synth Commands:".format(" "*(depth+1)))
-					while cmdBytes:
-						cmdType = (cmdBytes.pop(0) << 8) + cmdBytes.pop(0)
-						paramCount = cmdBytes.pop(0)
-						params = [cmdBytes.pop(0) for j in range(paramCount)]
-						if CommandType(cmdType) == CommandType.VolumeBus:
-							stringInd, volume = ParamsToArgs(params, [2, 2])
+					for cmdType, args in self.GetCommands("SynthCommand", cmdIndex):
+						if isinstance(args, tuple) and cmdType == CommandType.VolumeBus.value:
+							stringInd, volume = args
 							busName = self.Tables["StringValue"].GetRowField(stringInd, "StringValue").Value.Value
-							print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandType(cmdType).name, busName, volume))
+							print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandNames[cmdType], busName, volume))
 						else:
-							print("{}{} ({})".format(" "*(depth+2), CommandType(cmdType).name, ", ".join(str(p) for p in params)))
-			refItems2 = self.Tables["Synth"].GetRowField(refIndex, "ReferenceItems").Value.Value
-			refType2 = (refItems2[0] << 8) + refItems2[1]
-			refIndex2 = (refItems2[2] << 8) + refItems2[3]
-			self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=0, printing=printing, keycode=keycode, outputFormat=outputFormat, path=path, extracting=extracting)
+							print("{}{} ({})".format(" "*(depth+2), CommandNames[cmdType], ", ".join(str(p) for p in args)))
+			# only the first item gets followed
+			refType2, refIndex2 = self.Graph.Children(refType, refIndex)[0]
+			self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=0, printing=printing, keycode=keycode, outputFormat=outputFormat, path=path, extracting=extracting, tasks=tasks)
 		elif ReferenceType(refType) == ReferenceType.Sequence or ReferenceType(refType) == ReferenceType.LinkedSequence:
 			seqType = self.Tables["Sequence"].GetRowField(refIndex, "Type").Value
 			pbr = self.Tables["Sequence"].GetRowField(refIndex, "PlaybackRatio").Value
@@ -257,53 +299,41 @@ class ACB:
 						globalAisacName = self.Tables["GlobalAisacReference"].GetRowField(globalAisacInd, "Name").Value.Value
 						print("{}{}".format(" "*(depth+2), globalAisacName))
 				cmdIndex = self.Tables["Sequence"].GetRowField(refIndex, "CommandIndex").Value
-				cmdBytes = list(self.Tables["SeqCommand"].GetRowField(cmdIndex, "Command").Value.Value)
 				print("{}Sequence Commands:".format(" "*(depth+1)))
-				while cmdBytes:
-					cmdType = (cmdBytes.pop(0) << 8) + cmdBytes.pop(0)
-					paramCount = cmdBytes.pop(0)
-					params = [cmdBytes.pop(0) for j in range(paramCount)]
-					if CommandType(cmdType) == CommandType.Category:
-						assert paramCount == 4 or paramCount == 8
-						if paramCount == 4:
-							acfCategoryId = ParamsToArgs(params, [4])[0]
-						elif paramCount == 8:
-							unkIntParam, acfCategoryId = ParamsToArgs(params, [4, 4])
+				for cmdType, args in self.GetCommands("SeqCommand", cmdIndex):
+					if isinstance(args, tuple) and cmdType == CommandType.Category.value:
+						# either just the category, or something unknown followed by it
+						acfCategoryId = args[-1]
 						assert acfCategoryId in self.AcfCategories
 						acfCategory = self.AcfCategories[acfCategoryId]
-						print("{}{} = \"{}\"".format(" "*(depth+2), CommandType(cmdType).name, acfCategory))
-						assert not params
-					elif CommandType(cmdType) == CommandType.GlobalAisacReference:
-						ind = ParamsToArgs(params, [2])[0]
-						print("{}{}({})".format(" "*(depth+2), CommandType(cmdType).name, ind))
-					elif CommandType(cmdType) == CommandType.Pan3dInteriorDistanceGain:
-						unk = ParamsToArgs(params, [2])[0]
-						print("{}{}({})".format(" "*(depth+2), CommandType(cmdType).name, unk))
-					elif CommandType(cmdType) == CommandType.Pos3dDistanceMin or CommandType(cmdType) == CommandType.Pos3dDistanceMax:
-						assert paramCount == 4
-						flt = struct.unpack("!f", bytes(params))[0]
-						print("{}{} = {}".format(" "*(depth+2), CommandType(cmdType).name, flt))
-					elif CommandType(cmdType) == CommandType.CueLimitsAndMode:
-						limit1, limit2, mode = ParamsToArgs(params, [2, 2, 1])
-						print("{}{} ({}, {}, {})".format(" "*(depth+2), CommandType(cmdType).name, limit1, limit2, mode))
-					elif CommandType(cmdType) == CommandType.VolumeGain_Res100:
-						unk = ParamsToArgs(params, [2])[0]
-						print("{}{}({})".format(" "*(depth+2), CommandType(cmdType).name, unk))
-					elif CommandType(cmdType) == CommandType.VolumeBus:
-						stringInd, volume = ParamsToArgs(params, [2, 2])
+						print("{}{} = \"{}\"".format(" "*(depth+2), CommandNames[cmdType], acfCategory))
+					elif isinstance(args, tuple) and cmdType == CommandType.GlobalAisacReference.value:
+						ind = args[0]
+						print("{}{}({})".format(" "*(depth+2), CommandNames[cmdType], ind))
+					elif isinstance(args, tuple) and cmdType == CommandType.Pan3dInteriorDistanceGain.value:
+						unk = args[0]
+						print("{}{}({})".format(" "*(depth+2), CommandNames[cmdType], unk))
+					elif isinstance(args, tuple) and (cmdType == CommandType.Pos3dDistanceMin.value or cmdType == CommandType.Pos3dDistanceMax.value):
+						flt = args[0]
+						print("{}{} = {}".format(" "*(depth+2), CommandNames[cmdType], flt))
+					elif isinstance(args, tuple) and cmdType == CommandType.CueLimitsAndMode.value:
+						limit1, limit2, mode = args
+						print("{}{} ({}, {}, {})".format(" "*(depth+2), CommandNames[cmdType], limit1, limit2, mode))
+					elif isinstance(args, tuple) and cmdType == CommandType.VolumeGain_Res100.value:
+						unk = args[0]
+						print("{}{}({})".format(" "*(depth+2), CommandNames[cmdType], unk))
+					elif isinstance(args, tuple) and cmdType == CommandType.VolumeBus.value:
+						stringInd, volume = args
 						busName = self.Tables["StringValue"].GetRowField(stringInd, "StringValue").Value.Value
-						print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandType(cmdType).name, busName, volume))
-					elif CommandType(cmdType) == CommandType.Selector:
-						selectId = ParamsToArgs(params, [2])[0]
-						print("{}{}({})".format(" "*(depth+2), CommandType(cmdType).name, selectId))
+						print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandNames[cmdType], busName, volume))
+					elif isinstance(args, tuple) and cmdType == CommandType.Selector.value:
+						selectId = args[0]
+						print("{}{}({})".format(" "*(depth+2), CommandNames[cmdType], selectId))
 					else:
-						print("{}{} ({})".format(" "*(depth+2), CommandType(cmdType).name, ", ".join(str(p) for p in params)))
+						print("{}{} ({})".format(" "*(depth+2), CommandNames[cmdType], ", ".join(str(p) for p in args)))
 			#####
-			numTracks = self.Tables["Sequence"].GetRowField(refIndex, "NumTracks").Value
-			trackIndex = self.Tables["Sequence"].GetRowField(refIndex, "TrackIndex").Value.Value
-			for i in range(numTracks):
-				trackId = (trackIndex[2*i] << 8) + trackIndex[(2*i)+1]
-				self.RecursivelyGetReferences(ReferenceType.Track.value, trackId, depth=depth+1, ind=i, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{i}", extracting=extracting)
+			for i, (refType2, trackId) in enumerate(self.Graph.Children(refType, refIndex)):
+				self.RecursivelyGetReferences(refType2, trackId, depth=depth+1, ind=i, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{i}", extracting=extracting, tasks=tasks)
 		elif ReferenceType(refType) == ReferenceType.Track:
 			eventIndex = self.Tables["Track"].GetRowField(refIndex, "EventIndex").Value
 			if printing:
@@ -317,57 +347,49 @@ class ACB:
 						print("{}{}".format(" "*(depth+3), globalAisacName))
 				cmdIndex = self.Tables["Track"].GetRowField(refIndex, "CommandIndex").Value
 				if cmdIndex != 0xFFFF:
-					cmdBytes = list(self.Tables["TrackCommand"].GetRowField(cmdIndex, "Command").Value.Value)
 					print("{}Track Commands:".format(" "*(depth+1)))
-					while cmdBytes:
-						cmdType = (cmdBytes.pop(0) << 8) + cmdBytes.pop(0)
-						paramCount = cmdBytes.pop(0)
-						params = [cmdBytes.pop(0) for j in range(paramCount)]
-						if CommandType(cmdType) == CommandType.VolumeBus:
-							stringInd, volume = ParamsToArgs(params, [2, 2])
+					for cmdType, args in self.GetCommands("TrackCommand", cmdIndex):
+						if isinstance(args, tuple) and cmdType == CommandType.VolumeBus.value:
+							stringInd, volume = args
 							busName = self.Tables["StringValue"].GetRowField(stringInd, "StringValue").Value.Value
-							print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandType(cmdType).name, busName, volume))
+							print("{}{}({}) = {}/10000".format(" "*(depth+2), CommandNames[cmdType], busName, volume))
 						# looks like some kind of volume thing...
-						elif CommandType(cmdType) == CommandType.Biquad:
-							unk1, unk2, unk3, unk4 = ParamsToArgs(params, [1, 2, 2, 2])
-							print("{}{} ({}, {}, {}, {})".format(" "*(depth+2), CommandType(cmdType).name, unk1, unk2, unk3, unk4))
+						elif isinstance(args, tuple) and cmdType == CommandType.Biquad.value:
+							unk1, unk2, unk3, unk4 = args
+							print("{}{} ({}, {}, {}, {})".format(" "*(depth+2), CommandNames[cmdType], unk1, unk2, unk3, unk4))
 						# also looks like some kind of volume thing...
-						elif CommandType(cmdType) == CommandType.Bandpass:
-							unk1, unk2 = ParamsToArgs(params, [2, 2])
-							print("{}{} ({}, {})".format(" "*(depth+2), CommandType(cmdType).name, unk1, unk2))
-						elif CommandType(cmdType) == CommandType.TrackSelectorLabel:
-							selectId, selectVal = ParamsToArgs(params, [2, 2])
-							print("{}{}({}) == {}".format(" "*(depth+2), CommandType(cmdType).name, selectId, selectVal))
+						elif isinstance(args, tuple) and cmdType == CommandType.Bandpass.value:
+							unk1, unk2 = args
+							print("{}{} ({}, {})".format(" "*(depth+2), CommandNames[cmdType], unk1, unk2))
+						elif isinstance(args, tuple) and cmdType == CommandType.TrackSelectorLabel.value:
+							selectId, selectVal = args
+							print("{}{}({}) == {}".format(" "*(depth+2), CommandNames[cmdType], selectId, selectVal))
 						else:
-							print("{}{} ({})".format(" "*(depth+2), CommandType(cmdType).name, ", ".join(str(p) for p in params)))
+							print("{}{} ({})".format(" "*(depth+2), CommandNames[cmdType], ", ".join(str(p) for p in args)))
 			ind = 0
-			cmdBytes = list(self.Tables["TrackEvent"].GetRowField(eventIndex, "Command").Value.Value)
-			while cmdBytes:
-				cmdType = (cmdBytes.pop(0) << 8) + cmdBytes.pop(0)
-				paramCount = cmdBytes.pop(0)
-				params = [cmdBytes.pop(0) for j in range(paramCount)]
-				if CommandType(cmdType) == CommandType.NoteOn:
-					refType2, refIndex2 = ParamsToArgs(params, [2, 2])
-					self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=ind, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{ind}", extracting=extracting)
+			for cmdType, args in self.GetCommands("TrackEvent", eventIndex):
+				if isinstance(args, tuple) and cmdType == CommandType.NoteOn.value:
+					refType2, refIndex2 = args
+					self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=ind, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{ind}", extracting=extracting, tasks=tasks)
 					ind += 1
-				elif CommandType(cmdType) == CommandType.NoteOnWithNo:
-					refType2, refIndex2, unk = ParamsToArgs(params, [2, 2, 2])
-					self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=ind, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{ind}", extracting=extracting)
+				elif isinstance(args, tuple) and cmdType == CommandType.NoteOnWithNo.value:
+					refType2, refIndex2, unk = args
+					self.RecursivelyGetReferences(refType2, refIndex2, depth=depth+1, ind=ind, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{path}.{ind}", extracting=extracting, tasks=tasks)
 					ind += 1
-				elif printing and CommandType(cmdType) == CommandType.Delay:
-					milliseconds = ParamsToArgs(params, [4])[0]
-					print("{}{} = {} ms".format(" "*(depth+1), CommandType(cmdType).name, milliseconds))
-				elif printing and CommandType(cmdType) == CommandType.LoopStart:
-					loopId, loopCount = ParamsToArgs(params, [2, 2])
+				elif printing and isinstance(args, tuple) and cmdType == CommandType.Delay.value:
+					milliseconds = args[0]
+					print("{}{} = {} ms".format(" "*(depth+1), CommandNames[cmdType], milliseconds))
+				elif printing and isinstance(args, tuple) and cmdType == CommandType.LoopStart.value:
+					loopId, loopCount = args
 					if loopCount == 0xFFFF:
-						print("{}{} (Loop[{}]: indefinite)".format(" "*(depth+1), CommandType(cmdType).name, loopId))
+						print("{}{} (Loop[{}]: indefinite)".format(" "*(depth+1), CommandNames[cmdType], loopId))
 					else:
-						print("{}{} (Loop #{}: x{})".format(" "*(depth+1), CommandType(cmdType).name, loopId, loopCount))
-				elif printing and CommandType(cmdType) == CommandType.LoopEnd:
-					loopId, unk1, unk2 = ParamsToArgs(params, [2, 2, 2])
-					print("{}{} (Loop [{}]: {}, {})".format(" "*(depth+1), CommandType(cmdType).name, loopId, unk1, unk2))
+						print("{}{} (Loop #{}: x{})".format(" "*(depth+1), CommandNames[cmdType], loopId, loopCount))
+				elif printing and isinstance(args, tuple) and cmdType == CommandType.LoopEnd.value:
+					loopId, unk1, unk2 = args
+					print("{}{} (Loop [{}]: {}, {})".format(" "*(depth+1), CommandNames[cmdType], loopId, unk1, unk2))
 				elif printing and cmdType:
-					print("{}Track Event: {} ({})".format(" "*(depth+1), CommandType(cmdType).name, ", ".join(str(p) for p in params)))
+					print("{}Track Event: {} ({})".format(" "*(depth+1), CommandNames[cmdType], ", ".join(str(p) for p in args)))
 		elif ReferenceType(refType) == ReferenceType.LinkedCue:
 			if self.Tables["OutsideLink"] is not None:
 				acbIndex = self.Tables["OutsideLink"].GetRowField(refIndex, "AcbNameStringIndex").Value
@@ -386,6 +408,8 @@ class ACB:
 		else:
 			raise ValueError("Filetypes other than ADX and HCA not yet implemented.")
 		audio.frombytes(replacementBytes)
+		if EncodeExt[replacementType] == "HCA":
+			audio.VerifyFrames()
 		if awbId in mapper:
 			for row in mapper[awbId]:
 				self.Tables["Waveform"].SetRowField(row, "EncodeType", replacementType)
@@ -402,6 +426,7 @@ class ACB:
 								Field(typeFlag=4, name=RefString(encodingType=self.AcbStruct.EncodingType, value="LoopStart")),
 								Field(typeFlag=4, name=RefString(encodingType=self.AcbStruct.EncodingType, value="LoopEnd")),
 							],
+							columnar=self.AcbStruct.Columnar,
 						)))
 						self.AcbStruct.GetRowField(0, f"WaveformExtensionDataTable").Value.Length = 1 # dummy
 						self.Tables["WaveformExtensionData"] = self.AcbStruct.GetRowField(0, f"WaveformExtensionDataTable").Value.Value
@@ -415,22 +440,15 @@ class ACB:
 					self.Tables["Waveform"].SetRowField(row, "ExtensionData", 0xFFFF) # I don't feel like deleting the row if it exists, whatever
 				self.Tables["Waveform"].SetRowField(row, "SamplingRate", audio.SampleRate)
 				self.Tables["Waveform"].SetRowField(row, "NumSamples", audio.SampleCount)
+				self.Graph.UpdateWaveform(row)
 				awb.EntryData[awb.IdToInd[awbId]] = replacementBytes
-			if streaming:
-				self.StreamAwbStruct.update_offsets()
-				if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value is not None:
-					if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Magic == b"@UTF":
-						self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.GetRowField(0, "Header").Value.Value.set_equal(self.StreamAwbStruct)
-					else:
-						self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.set_equal(self.StreamAwbStruct)
-				self.RefreshHash()
-			self.AcbStruct.update_offsets()
+			self.UpdateLayout(streaming)
 		else:
 			raise ValueError("{} AWB doesn't contain an entry with ID {}.".format("Streamed" if streaming else "In-memory", awbId))
 
 	# new AWB entry
 	def AddAwbEntry(self, streaming, newBytes, awbId=None):
-		awbMap = self.StreamAwbStruct.IdToInd if streaming else self.MemoryAwbStruct.Id2Ind
+		awbMap = self.StreamAwbStruct.IdToInd if streaming else self.MemoryAwbStruct.IdToInd
 		if awbId is None:
 			for existingId in awbMap:
 				if existingId+1 not in awbMap:
@@ -442,12 +460,13 @@ class ACB:
 		assert awb is not None
 
 		awb.EntryCount += 1
-		entry = max([entry2.Value for entry2 in awb.EntryIds]) + 1
 
 		entryId = AfsValue()
 		entryId.FieldLength = awb.IdFieldLength
 		entryId.Value = awbId
 		awb.EntryIds.append(entryId)
+		# otherwise only filled in again once the offsets are, which a batch holds back
+		awb.IdToInd[awbId] = awb.EntryCount - 1
 
 		if awb.EndPosition.Value % awb.Align:
 			awb.EntryPads.append(b"\x00"*(awb.Align - (awb.EndPosition.Value % awb.Align)))
@@ -462,16 +481,7 @@ class ACB:
 		awb.EndPosition = endPosition
 	
 		awb.EntryData.append(newBytes)
-		if streaming:
-			self.StreamAwbStruct.update_offsets()
-			if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value is not None:
-				if self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Magic == b"@UTF":
-					self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.GetRowField(0, "Header").Value.Value.set_equal(self.StreamAwbStruct)
-				else:
-					self.AcbStruct.GetRowField(0, "StreamAwbAfs2Header").Value.Value.set_equal(self.StreamAwbStruct)
-			self.RefreshHash()
-		else:
-			self.AcbStruct.update_offsets()
+		self.UpdateLayout(streaming, acb=not streaming)
 		return awbId
 
 	def AddWaveformRow(self, streaming, newType, awbId):
@@ -479,11 +489,12 @@ class ACB:
 		assert awb is not None
 		if EncodeExt[newType] == "ADX":
 			audio = ADX()
+			audio.frombytes(awb.EntryData[awb.IdToInd[awbId]])
 		elif EncodeExt[newType] == "HCA":
 			audio = HCA()
+			audio.frombytes(awb.EntryData[awb.IdToInd[awbId]], headerOnly=True)
 		else:
 			raise ValueError("Filetypes other than ADX and HCA not yet implemented.")
-		audio.frombytes(awb.EntryData[awbId])
 		rowFields = {
 			"EncodeType": newType,
 			"Streaming": streaming,
@@ -504,6 +515,9 @@ class ACB:
 			rowFields["StreamAwbId"] = 0xFFFF
 		waveRow = self.Tables["Waveform"].RowCount
 		self.Tables["Waveform"].AddRow(rowFields)
+		mapper = self.StreamAwbId2WaveformRow if streaming else self.MemoryAwbId2WaveformRow
+		mapper.setdefault(awbId, set()).add(waveRow)
+		self.Graph.UpdateWaveform(waveRow)
 		return audio.Duration, waveRow
 
 	def AddWaveformExtensionRow(self, loopStart, loopEnd):
@@ -538,6 +552,7 @@ class ACB:
 			"ActionTrackStartIndex": 0xFFFF,
 			"NumActionTracks": 0,
 		})
+		self.Graph.UpdateNode(ReferenceType.Synth.value, synthRow)
 		return synthRow
 
 	def AddSynthCommandRow(self, synthRow):
@@ -576,6 +591,7 @@ class ACB:
 			"Scope": 0,
 			"TargetTrackNo": 0xFFFF,
 		})
+		self.Graph.UpdateNode(ReferenceType.Track.value, trackRow)
 		return trackRow
 
 	# TODO: this is as dumb as can be for now
@@ -611,6 +627,7 @@ class ACB:
 			"ControlWorkArea1": 1,
 			"ControlWorkArea2": 1,
 		})
+		self.Graph.UpdateNode(ReferenceType.Sequence.value, seqRow)
 		return seqRow
 
 	def AddCueRow(self, length, seqRow, cueId=None):
@@ -634,6 +651,8 @@ class ACB:
 			"NumAisacControlMaps": 0,
 			"HeaderVisibility": 1,
 		})
+		self.CueId2CueRow[cueId] = cueRow
+		self.Graph.UpdateCue(cueRow)
 		return cueId, cueRow
 
 	def AddCueNameRow(self, cueName, cueRow):
@@ -642,42 +661,69 @@ class ACB:
 			"CueName": RefString(encodingType=self.Tables["CueName"].EncodingType, value=cueName),
 			"CueIndex": cueRow
 		})
+		cueId = self.Tables["Cue"].GetRowField(cueRow, "CueId").Value
+		self.CueId2CueNameRow[cueId] = cueNameRow
 		return cueNameRow
 
 	def AddWaveformAndCue(self, streaming, newBytes, newType, cueName=None, cueId=None, seqCmdBytes=None):
-		# new AWB entry
-		awbId = self.AddAwbEntry(streaming, newBytes)
-		# new Waveform row
-		length, waveRow = self.AddWaveformRow(streaming, ExtEncode[newType].value, awbId)
-		# new Synth row
-		synthRow = self.AddSynthRow(waveRow)
-		# new Command row
-		trackEventRow = self.AddSynthCommandRow(synthRow)
-		#trackEventRow = self.AddLinkCommandRow(cueId)
-		# new Track row
-		trackRow = self.AddTrackRow(trackEventRow)
-		# new Sequence Command row
-		if seqCmdBytes is None:
-			seqCmdBytes = list(self.Tables["SeqCommand"].GetRowField(0, "Command").Value.Value)
-		seqCmdRow = self.AddSeqCommandRow(seqCmdBytes)
-		# new Sequence row
-		seqRow = self.AddSequenceRow([trackRow], cmdRow=seqCmdRow)
-		# new Cue row
-		cueId, cueRow = self.AddCueRow(length, seqRow, cueId=cueId)
-		# new CueName row
-		if cueName is None:
-			cueName = f"Cue{cueId}"
-		cueNameRow = self.AddCueNameRow(cueName, cueRow)
-
-		return cueId, cueNameRow
+		return self.AddWaveformsAndCues(streaming, [(newBytes, newType, cueName, cueId)], seqCmdBytes)[0]
+
+	# entries are (newBytes, newType, cueName, cueId), with cueName and cueId optional as above
+	def AddWaveformsAndCues(self, streaming, entries, seqCmdBytes=None):
+		# each table gets all of its new rows one after the other, and the layout is only redone at the end
+		with self.Batch():
+			# new AWB entries
+			awbIds = [self.AddAwbEntry(streaming, newBytes) for newBytes, newType, cueName, cueId in entries]
+			# new Waveform rows
+			waveforms = [self.AddWaveformRow(streaming, ExtEncode[entry[1]].value, awbId) for entry, awbId in zip(entries, awbIds)]
+			# new Synth rows
+			synthRows = [self.AddSynthRow(waveRow) for length, waveRow in waveforms]
+			# new Command rows
+			trackEventRows = [self.AddSynthCommandRow(synthRow) for synthRow in synthRows]
+			#trackEventRow = self.AddLinkCommandRow(cueId)
+			# new Track rows
+			trackRows = [self.AddTrackRow(trackEventRow) for trackEventRow in trackEventRows]
+			# new Sequence Command rows
+			if seqCmdBytes is None:
+				seqCmdBytes = list(self.Tables["SeqCommand"].GetRowField(0, "Command").Value.Value)
+			seqCmdRows = [self.AddSeqCommandRow(seqCmdBytes) for entry in entries]
+			# new Sequence rows
+			seqRows = [self.AddSequenceRow([trackRow], cmdRow=seqCmdRow) for trackRow, seqCmdRow in zip(trackRows, seqCmdRows)]
+			# new Cue rows
+			cues = [self.AddCueRow(length, seqRow, cueId=entry[3]) for entry, (length, waveRow), seqRow in zip(entries, waveforms, seqRows)]
+			# new CueName rows
+			added = list()
+			for entry, (cueId, cueRow) in zip(entries, cues):
+				cueName = entry[2]
+				if cueName is None:
+					cueName = f"Cue{cueId}"
+				added.append((cueId, self.AddCueNameRow(cueName, cueRow)))
+
+		return added
 
 	def SetSeqCommandRow(self, cmdRow, cmdBytes):
 		self.Tables["SeqCommand"].SetRow(cmdRow, {
 			"Command": RefData(length=len(cmdBytes), magic=b"\x00"*4, value=array.array("B", cmdBytes))
 		})
+		# older ACBs keep every kind of command in the one table
+		for tableName in CommandFormats:
+			if self.Tables[tableName] is self.Tables["SeqCommand"]:
+				self.CommandCache.pop((tableName, cmdRow), None)
+
+	def ExtractionTask(self, awb, awbId, encodeType, path, keycode=None, outputFormat=None):
+		decodable = awb is not None and EncodeExt[encodeType] in ("ADX", "HCA")
+		filename = "{}.{}".format(path, outputFormat if outputFormat is not None and decodable else EncodeExt[encodeType])
+		if awb is None:
+			return filename, None
+		if keycode is not None and EncodeExt[encodeType] == "HCA":
+			keycode = keycode * ((awb.Key << 16) | ((~awb.Key + 2) + 2**16))
+		# the entry itself is only looked up once it's known whether the tasks go to other processes
+		return filename, (filename, EncodeExt[encodeType], (awb, awb.IdToInd[awbId]), keycode, outputFormat)
 
-	def Extract(self, base_path, keycode=None, outputFormat=None, printing=False, nameByCue=False):
+	def Extract(self, base_path, keycode=None, outputFormat=None, printing=False, nameByCue=False, jobs=None):
 		os.makedirs(base_path, exist_ok=True)
+		# everything gets printed and queued in order first, then the files are written, in parallel if asked
+		tasks = list()
 		if nameByCue:
 			for cueId in sorted(self.CueId2CueNameRow):
 				cueRow = self.CueId2CueRow[cueId]
@@ -687,42 +733,28 @@ class ACB:
 					print(f"Cue #{cueId}: {cueName}")
 				refType = self.Tables["Cue"].GetRowField(cueRow, "ReferenceType").Value
 				refIndex = self.Tables["Cue"].GetRowField(cueRow, "ReferenceIndex").Value
-				self.RecursivelyGetReferences(refType, refIndex, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{base_path}/{cueId}.{cueName}", extracting=True)
+				self.RecursivelyGetReferences(refType, refIndex, printing=printing, keycode=keycode, outputFormat=outputFormat, path=f"{base_path}/{cueId}.{cueName}", extracting=True, tasks=tasks)
 				if printing:
 					print()
 		else:
 			for i in range(self.Tables["Waveform"].RowCount):
-				streaming = self.Tables["Waveform"].GetRowField(i, "Streaming").Value
-				encodeType = self.Tables["Waveform"].GetRowField(i, "EncodeType").Value
-				extIndex = self.Tables["Waveform"].GetRowField(i, "ExtensionData").Value
-				if streaming:
-					awb = self.StreamAwbStruct
-					if self.SimpleAwbId:
-						awbId = self.Tables["Waveform"].GetRowField(i, "Id").Value
-					else:
-						assert self.Tables["Waveform"].GetRowField(i, "MemoryAwbId").Value == 65535
-						awbId = self.Tables["Waveform"].GetRowField(i, "StreamAwbId").Value
-				else:
-					awb = self.MemoryAwbStruct
-					if self.SimpleAwbId:
-						awbId = self.Tables["Waveform"].GetRowField(i, "Id").Value
-					else:
-						assert self.Tables["Waveform"].GetRowField(i, "StreamAwbId").Value == 65535
-						awbId = self.Tables["Waveform"].GetRowField(i, "MemoryAwbId").Value
+				streaming, awbId, encodeType = self.Graph.Waveforms[i]
+				awb = self.StreamAwbStruct if streaming else self.MemoryAwbStruct
 				audio = None
-				if awb is not None:
+				if awb is not None and printing:
 					if EncodeExt[encodeType] == "ADX":
 						audio = ADX()
 						audio.frombytes(awb.EntryData[awb.IdToInd[awbId]])
 					elif EncodeExt[encodeType] == "HCA":
 						audio = HCA()
-						audio.frombytes(awb.EntryData[awb.IdToInd[awbId]])
+						audio.frombytes(awb.EntryData[awb.IdToInd[awbId]], headerOnly=True)
 				if printing:
 					print("Waveform from {} AWB".format("Streaming" if streaming else "Memory"))
 					print(" ID: {}".format(awbId))
 					print(" Type: {}".format(EncodeExt[encodeType]))
 					print(" Channels: {}".format(self.Tables["Waveform"].GetRowField(i, "NumChannels").Value))
 					print(" Loop: {}".format(self.Tables["Waveform"].GetRowField(i, "LoopFlag").Value))
+					extIndex = self.Tables["Waveform"].GetRowField(i, "ExtensionData").Value
 					if extIndex != 0xFFFF:
 						print("  Loop Start: {}".format(self.Tables["WaveformExtensionData"].GetRowField(extIndex, "LoopStart").Value))
 						print("  Loop End: {}".format(self.Tables["WaveformExtensionData"].GetRowField(extIndex, "LoopEnd").Value))
@@ -737,35 +769,215 @@ class ACB:
 							print("   Loop End: {}".format(audio.LoopEndSample))
 						print("  Sampling Rate: {}".format(audio.SampleRate))
 						print("  Samples: {}".format(audio.SampleCount))
-				if outputFormat is not None:
-					output_ext = outputFormat
-				else:
-					output_ext = EncodeExt[encodeType]
-				filename = "{}/{}-{}.{}".format(base_path, "stream" if streaming else "memory", awbId, output_ext)
-				if audio is not None:
-					if keycode is not None:
-						if EncodeExt[encodeType] == "ADX":
-							audio.decrypt(keycode)
-						elif EncodeExt[encodeType] == "HCA":
-							audio.Crypt(keycode * ((awb.Key << 16) | ((~awb.Key + 2) + 2**16)))
-					audio.write_right(filename)
-				elif awb is not None:
-					with open(filename, "wb") as f:
-						f.write(awb.EntryData[awbId])
+				filename, task = self.ExtractionTask(awb, awbId, encodeType, "{}/{}-{}".format(base_path, "stream" if streaming else "memory", awbId), keycode, outputFormat)
+				if task is not None:
+					tasks.append(task)
 				else:
 					print(f"   Matching AWB not found; skipping extraction for {filename}.")
 				if printing:
 					print()
 
+		# several rows can point at the same AWB entry, and two processes shouldn't write the same file
+		tasks = list({task[0]: task for task in reversed(tasks)}.values())[::-1]
+		pooled = jobs is not None and jobs > 1 and len(tasks) > 1
+		tasks = [(filename, encodeName, EntrySource(*entry, pooled), keycode, outputFormat) for filename, encodeName, entry, keycode, outputFormat in tasks]
+		if not pooled:
+			for task in tasks:
+				ExtractWaveform(*task)
+		else:
+			with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+				# consumed in order so that the first failure is the one reported
+				for result in executor.map(ExtractWaveform, *zip(*tasks), chunksize=max(1, len(tasks) // (jobs*8))):
+					pass
+
+
+class CueGraph:
+
+	# row indices of what each cue, synth, sequence and track refers to, in table order
+	def __init__(self, acb):
+		self.Acb = acb
+		self.Cues = list()
+		self.Nodes = {
+			ReferenceType.Synth.value: list(),
+			ReferenceType.Sequence.value: list(),
+			ReferenceType.Track.value: list(),
+		}
+		# (streaming, AWB id, encode type) by Waveform row
+		self.Waveforms = list()
+		self.WaveformCache = dict()
+		# the other way around: cue rows by the Waveform rows they reach, built the first time it's needed
+		self.WaveformCueRows = None
+
+		for row in range(acb.Tables["Waveform"].RowCount):
+			self.UpdateWaveform(row)
+		for refType, tableName in NodeTables.items():
+			if acb.Tables[tableName] is not None:
+				for row in range(acb.Tables[tableName].RowCount):
+					self.UpdateNode(refType, row)
+		for row in range(acb.Tables["Cue"].RowCount):
+			self.UpdateCue(row)
+
+	def UpdateWaveform(self, row):
+		table = self.Acb.Tables["Waveform"]
+		streaming = table.GetRowField(row, "Streaming").Value
+		if self.Acb.SimpleAwbId:
+			awbId = table.GetRowField(row, "Id").Value
+		elif streaming:
+			assert table.GetRowField(row, "MemoryAwbId").Value == 0xFFFF
+			awbId = table.GetRowField(row, "StreamAwbId").Value
+		else:
+			assert table.GetRowField(row, "StreamAwbId").Value == 0xFFFF
+			awbId = table.GetRowField(row, "MemoryAwbId").Value
+		waveform = (streaming, awbId, table.GetRowField(row, "EncodeType").Value)
+		if row == len(self.Waveforms):
+			self.Waveforms.append(waveform)
+		else:
+			self.Waveforms[row] = waveform
+
+	def UpdateNode(self, refType, row):
+		table = self.Acb.Tables[NodeTables[refType]]
+		if refType == ReferenceType.Synth.value:
+			refItems = table.GetRowField(row, "ReferenceItems").Value.Value
+			refItems = bytes(refItems) if refItems is not None else b""
+			children = tuple(ReferenceItem.iter_unpack(refItems[:len(refItems) - len(refItems) % ReferenceItem.size]))
+		elif refType == ReferenceType.Sequence.value:
+			numTracks = table.GetRowField(row, "NumTracks").Value
+			trackIndex = bytes(table.GetRowField(row, "TrackIndex").Value.Value or b"")
+			children = tuple((ReferenceType.Track.value, trackId) for trackId in struct.unpack_from(f">{numTracks}H", trackIndex))
+		else:
+			eventIndex = table.GetRowField(row, "EventIndex").Value
+			children = list()
+			if eventIndex != 0xFFFF:
+				for cmdType, args in self.Acb.GetCommands("TrackEvent", eventIndex):
+					if isinstance(args, tuple) and (cmdType == CommandType.NoteOn.value or cmdType == CommandType.NoteOnWithNo.value):
+						children.append((args[0], args[1]))
+			children = tuple(children)
+		nodes = self.Nodes[refType]
+		if row == len(nodes):
+			nodes.append(children)
+		else:
+			# rows below this one may have reached something different through it
+			nodes[row] = children
+			self.WaveformCache.clear()
+			self.WaveformCueRows = None
+
+	def UpdateCue(self, row):
+		table = self.Acb.Tables["Cue"]
+		cue = (table.GetRowField(row, "ReferenceType").Value, table.GetRowField(row, "ReferenceIndex").Value)
+		if row == len(self.Cues):
+			self.Cues.append(cue)
+		else:
+			self.Cues[row] = cue
+		self.WaveformCueRows = None
+
+	def Children(self, refType, refIndex):
+		refType = LinkedTypes.get(refType, refType)
+		if refType in self.Nodes:
+			return self.Nodes[refType][refIndex]
+		return ()
+
+	def Reachable(self, refType, refIndex):
+		refType = LinkedTypes.get(refType, refType)
+		if refType == ReferenceType.Waveform.value:
+			return (refIndex,)
+		if (refType, refIndex) not in self.WaveformCache:
+			# placeholder so that a reference loop ends instead of recursing forever
+			self.WaveformCache[(refType, refIndex)] = ()
+			waveRows = dict()
+			for refType2, refIndex2 in self.Children(refType, refIndex):
+				waveRows.update(dict.fromkeys(self.Reachable(refType2, refIndex2)))
+			self.WaveformCache[(refType, refIndex)] = tuple(waveRows)
+		return self.WaveformCache[(refType, refIndex)]
+
+	def CueWaveforms(self, cueRow):
+		return self.Reachable(*self.Cues[cueRow])
+
+	def WaveformCues(self, waveRow):
+		# one pass over the cues, which shares the reachability cache with CueWaveforms
+		if self.WaveformCueRows is None:
+			self.WaveformCueRows = dict()
+			for cueRow in range(len(self.Cues)):
+				for row in self.CueWaveforms(cueRow):
+					self.WaveformCueRows.setdefault(row, set()).add(cueRow)
+		return self.WaveformCueRows.get(waveRow, set())
+
+
+def EntrySource(awb, ind, pooled=False):
+	# worker processes get a streamed entry as its place in the file rather than a copy of its bytes
+	entry = awb.GetRawEntry(ind)
+	if pooled and isinstance(entry, DeferredBytes) and entry.source.current_filepath() is not None:
+		return (entry.source.filepath, entry.offset, entry.length)
+	entry = awb.EntryData[ind]
+	return bytes(entry) if pooled else entry
+
+
+def ExtractWaveform(filename, encodeName, source, keycode=None, outputFormat=None):
+	if isinstance(source, tuple):
+		path, offset, length = source
+		# only mapped for as long as it takes to pull this entry out
+		with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+			source = mapping[offset:offset+length]
+	if encodeName == "ADX":
+		audio = ADX()
+		audio.frombytes(source)
+		if keycode is not None:
+			audio.decrypt(keycode)
+	elif encodeName == "HCA":
+		audio = HCA()
+		audio.frombytes(source)
+		if keycode is not None:
+			audio.Crypt(keycode)
+	else:
+		with open(filename, "wb") as f:
+			f.write(source)
+		return
+	WriteAudio(audio, filename, outputFormat)
+
+
+def WriteAudio(audio, filename, outputFormat=None):
+	if outputFormat is None or outputFormat.upper() == type(audio).__name__:
+		audio.write_right(filename)
+	elif outputFormat.upper() in ("WAV", "WAVE"):
+		wave = WAVE(numChannels=audio.ChannelCount, sampleRate=audio.SampleRate)
+		wave.encode(audio.decode()[:audio.SampleCount*audio.ChannelCount])
+		wave.write_right(filename)
+	else:
+		raise ValueError(f"Can't convert {type(audio).__name__} to {outputFormat}; only WAV output is supported.")
+
+
+def ReadStruct(struct, path, mapped=True):
+	if mapped:
+		struct.read_mapped(path)
+	else:
+		with open(path, "rb") as f:
+			struct.frombytes(f.read())
+	return struct
 
-def ParamsToArgs(paramBytes, argSizes):
-	ret = list()
-	assert len(paramBytes) == sum(argSizes)
-	for argSize in argSizes:
-		ret.append(sum(paramBytes.pop(0) << (i*8) for i in reversed(range(argSize))))
-	assert len(ret) == len(argSizes)
-	assert not paramBytes
-	return ret
+
+# commands are a big-endian u16 type and a u8 parameter size, followed by the parameters
+CommandHeader = struct.Struct(">HB")
+
+
+def ParseCommands(cmdBytes, formats):
+	# commands with a known layout come back as a tuple of their arguments; anything else,
+	# including a known command with an unexpected size, comes back as the raw parameter bytes
+	view = memoryview(cmdBytes if cmdBytes is not None else b"")
+	commands = list()
+	pos = 0
+	while pos < len(view):
+		if pos + CommandHeader.size > len(view):
+			raise ValueError(f"Command list is truncated at byte {pos}.")
+		cmdType, paramCount = CommandHeader.unpack_from(view, pos)
+		pos += CommandHeader.size
+		if pos + paramCount > len(view):
+			raise ValueError(f"Command list is truncated at byte {pos}.")
+		if cmdType in formats and paramCount in formats[cmdType]:
+			args = formats[cmdType][paramCount].unpack_from(view, pos)
+		else:
+			args = bytes(view[pos:pos+paramCount])
+		commands.append((cmdType, args))
+		pos += paramCount
+	return commands
 
 
 class ReferenceType(Enum):
@@ -1008,3 +1220,51 @@ class ExtEncode(Enum):
 	AT92		= 18
 	M4A			= 19
 	OGG			= 24
+
+
+CommandNames = {cmd.value: cmd.name for cmd in CommandType}
+
+# argument layouts of the commands that get looked into, by table and then by parameter size
+CommandFormats = {
+	"TrackEvent": {
+		CommandType.NoteOn.value: {4: struct.Struct(">HH")},
+		CommandType.NoteOnWithNo.value: {6: struct.Struct(">HHH")},
+		CommandType.Delay.value: {4: struct.Struct(">I")},
+		CommandType.LoopStart.value: {4: struct.Struct(">HH")},
+		CommandType.LoopEnd.value: {6: struct.Struct(">HHH")},
+	},
+	"TrackCommand": {
+		CommandType.VolumeBus.value: {4: struct.Struct(">HH")},
+		CommandType.Biquad.value: {7: struct.Struct(">BHHH")},
+		CommandType.Bandpass.value: {4: struct.Struct(">HH")},
+		CommandType.TrackSelectorLabel.value: {4: struct.Struct(">HH")},
+	},
+	"SynthCommand": {
+		CommandType.VolumeBus.value: {4: struct.Struct(">HH")},
+	},
+	"SeqCommand": {
+		CommandType.Category.value: {4: struct.Struct(">I"), 8: struct.Struct(">II")},
+		CommandType.GlobalAisacReference.value: {2: struct.Struct(">H")},
+		CommandType.Pan3dInteriorDistanceGain.value: {2: struct.Struct(">H")},
+		CommandType.Pos3dDistanceMin.value: {4: struct.Struct(">f")},
+		CommandType.Pos3dDistanceMax.value: {4: struct.Struct(">f")},
+		CommandType.CueLimitsAndMode.value: {5: struct.Struct(">HHB")},
+		CommandType.VolumeGain_Res100.value: {2: struct.Struct(">H")},
+		CommandType.VolumeBus.value: {4: struct.Struct(">HH")},
+		CommandType.Selector.value: {2: struct.Struct(">H")},
+	},
+}
+
+
+# reference types whose rows point further down, and the tables those rows are in
+NodeTables = {
+	ReferenceType.Synth.value: "Synth",
+	ReferenceType.Sequence.value: "Sequence",
+	ReferenceType.Track.value: "Track",
+}
+LinkedTypes = {
+	ReferenceType.LinkedSynth.value: ReferenceType.Synth.value,
+	ReferenceType.LinkedSequence.value: ReferenceType.Sequence.value,
+}
+# synth reference items are a big-endian u16 reference type and a u16 row index
+ReferenceItem = struct.Struct(">HH")
@@ -1,10 +1,19 @@
 
 import array
+import concurrent.futures
+import functools
 import math
+import os
+import time
 
 from enum import Enum
 from io import BufferedReader, BytesIO
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 from exbip.Serializable import Serializable
 from exbip.BinaryTargets.Interface.Base import EndiannessManager
 
@@ -61,7 +70,7 @@ class ADX(Serializable):
 		self.FooterPadding = None
 
 	def update_offsets(self):
-		self.tobytes()
+		self.calcsize()
 
 	def write_right(self, path):
 		self.update_offsets()
@@ -129,7 +138,7 @@ class ADX(Serializable):
 
 		# i have NO idea why the amount of padding is whatever it is so fuck that i guess
 		# if it breaks later on i can figure it out then
-		if rw.is_parselike:
+		if rw.is_parselike and self.AudioMagic is None:
 			self.AudioMagic = b"(c)CRI"
 		self.AudioMagic = rw.rw_bytestring(self.AudioMagic, self.HeaderSize+4-rw.tell())
 		assert self.AudioMagic == b"\x00"*(len(self.AudioMagic)-6) + b"(c)CRI"
@@ -160,6 +169,8 @@ class ADX(Serializable):
 		self.FooterPaddingSize = rw.rw_uint16(self.FooterPaddingSize)
 		assert self.FooterPaddingSize == paddingSize
 
+		if rw.is_parselike and self.FooterPadding is None:
+			self.FooterPadding = b"\x00"*paddingSize
 		self.FooterPadding = rw.rw_bytestring(self.FooterPadding, paddingSize)
 		assert self.FooterPadding == b"\x00"*paddingSize
 
@@ -176,7 +187,7 @@ class ADX(Serializable):
 
 	def SetCoefficients(self):
 		if EncodingMode(self.EncodingType) == EncodingMode.Fixed:
-			self.Coefficients = [[0, 0], [3840, 0], [7360, 62208], [6272, 62016]]
+			self.Coefficients = [[0, 0], [3840, 0], [7360, -3328], [6272, -3520]]
 		else:
 			z = math.cos(2.0*math.pi*self.HighpassFreq/self.SampleRate);
 			a = math.sqrt(2)-z;
@@ -187,43 +198,190 @@ class ADX(Serializable):
 			self.Coefficients = [[coef1, coef2]]
 
 	def decode(self):
-		pcmData = [0]*(self.SamplesPerFrame*self.ChannelCount*self.FrameCount)
+		mode = EncodingMode(self.EncodingType)
+		if numpy is None:
+			pcmData = array.array("h", bytes(2*self.SamplesPerFrame*self.ChannelCount*self.FrameCount))
+		else:
+			pcmData = numpy.zeros((self.FrameCount, self.SamplesPerFrame, self.ChannelCount), dtype=numpy.int16)
+		for channel in range(self.ChannelCount):
+			history1, history2 = (ToSigned16(sample) for sample in self.HistorySamples[channel])
+			if numpy is None:
+				deltas, frameCoefficients, sampleCounts = self.UnpackFramesPython(channel, mode)
+			else:
+				deltas, frameCoefficients, sampleCounts = self.UnpackFrames(channel, mode)
+			samples = PredictSamples(deltas, frameCoefficients, sampleCounts, history1, history2, self.SamplesPerFrame)
+			if numpy is None:
+				pcmData[channel::self.ChannelCount] = samples
+			else:
+				pcmData[:, :, channel] = numpy.frombuffer(samples, dtype=numpy.int16).reshape(self.FrameCount, self.SamplesPerFrame)
+		return pcmData if numpy is None else pcmData.reshape(-1)
+
+	def FrameLayout(self, channel):
+		starts = [self.BaseOffset + (i*self.ChannelCount + channel)*self.FrameSize for i in range(self.FrameCount)]
+		dataStarts = [start + 2 for start in starts]
+		sampleCounts = [self.SamplesPerFrame] * self.FrameCount
+		if self.FrameCount: #TODO: ....actually I dunno about how I've handled this
+			dataStarts[0] += self.FirstOffset // 2
+			sampleCounts[0] -= self.FirstOffset
+		# frames (or the tails of frames) that run past the end of the audio data decode to silence
+		for i in range(self.FrameCount):
+			if starts[i] + 1 >= self.AudioSize:
+				sampleCounts[i] = 0
+			else:
+				sampleCounts[i] = max(0, min(sampleCounts[i], 2*(self.AudioSize - dataStarts[i])))
+		return starts, dataStarts, sampleCounts
+
+	def FrameScales(self, filterNums, scales, mode):
+		if mode == EncodingMode.Fixed:
+			return (scales & 0x1FFF) + 1
+		assert not any(filterNums)
+		if mode == EncodingMode.Exponential:
+			return 1 << (12 - scales)
+		return scales + 1
+
+	def UnpackFrames(self, channel, mode):
+		starts, dataStarts, sampleCounts = (numpy.array(values, dtype=numpy.int64) for values in self.FrameLayout(channel))
+		audioData = numpy.frombuffer(self.AudioDataBytes, dtype=numpy.uint8)[:self.AudioSize]
+		# pad out so that frames running off the end can still be gathered; they get cut by sampleCounts
+		paddedSize = max(self.AudioSize, int(starts.max(initial=0)) + self.FrameSize + self.FirstOffset // 2)
+		audioData = numpy.concatenate((audioData, numpy.zeros(paddedSize - len(audioData), dtype=numpy.uint8))).astype(numpy.int64)
+
+		filterNums = (audioData[starts] >> 5) & 0xF
+		scales = (audioData[starts] << 8) + audioData[starts+1]
+		present = sampleCounts > 0
+		filterNums = numpy.where(present, filterNums, 0)
+		if mode == EncodingMode.Exponential:
+			assert numpy.all(scales[present] <= 12)
+			scales = numpy.where(present, scales, 12)
+		scales = self.FrameScales(filterNums, scales, mode)
+
+		nibbleInds = numpy.arange(self.SamplesPerFrame)
+		frameBytes = audioData[dataStarts[:, None] + nibbleInds[None, :] // 2]
+		nibbles = numpy.where(nibbleInds % 2, frameBytes & 0xF, frameBytes >> 4)
+		deltas = ((nibbles ^ 0x8) - 0x8) * scales[:, None]
+
+		coefficients = numpy.array(self.Coefficients, dtype=numpy.int64)[filterNums]
+		return deltas.reshape(-1).tolist(), coefficients.tolist(), sampleCounts.tolist()
+
+	def UnpackFramesPython(self, channel, mode):
+		starts, dataStarts, sampleCounts = self.FrameLayout(channel)
+		deltas = [0]*(self.SamplesPerFrame*self.FrameCount)
+		frameCoefficients = list()
+		for i, (start, dataStart, sampleCount) in enumerate(zip(starts, dataStarts, sampleCounts)):
+			if not sampleCount:
+				frameCoefficients.append(self.Coefficients[0])
+				continue
+			filterNum = (self.AudioDataBytes[start] >> 5) & 0xF
+			scale = (self.AudioDataBytes[start] << 8) + self.AudioDataBytes[start+1]
+			scale = self.FrameScales([filterNum], scale, mode)
+			for j in range(sampleCount):
+				byte = self.AudioDataBytes[dataStart + (j//2)]
+				# if odd, get low nibble; if even, get high nibble
+				nibble = byte & 0xF if j % 2 else byte >> 4
+				deltas[i*self.SamplesPerFrame + j] = ((nibble ^ 0x8) - 0x8) * scale
+			frameCoefficients.append(self.Coefficients[filterNum])
+		return deltas, frameCoefficients, sampleCounts
+
+	def encode(self, pcmData):
+		# pcmData is interleaved signed 16-bit samples, laid out the same way decode() returns them
+		mode = EncodingMode(self.EncodingType)
+		assert mode != EncodingMode.Ahx
+		self.SetCoefficients()
+		self.Revision = 0
+		self.CodingType = None
+
+		self.SampleCount = len(pcmData) // self.ChannelCount
+		self.Duration = int(1000*self.SampleCount/self.SampleRate)
+		self.SamplesPerFrame = (self.FrameSize - 2) * 2
+		self.FrameCount = math.ceil(self.SampleCount / self.SamplesPerFrame)
+		self.AudioSize = self.FrameSize*self.FrameCount*self.ChannelCount
+		self.InsertedSamples = 0
+		self.BaseOffset = 0
+		self.FirstOffset = 0
+		self.LoopCount = None
+		self.FooterPadding = None
+
+		self.HistorySamples = [array.array("H", [0, 0]) for i in range(self.ChannelCount)]
+		headerEnd = 20
+		if self.Version == 4:
+			headerEnd += 4 + 4*self.ChannelCount + (4 if self.ChannelCount == 1 else 0)
+		self.AudioMagic = b"\x00"*4 + b"(c)CRI"
+		self.HeaderSize = headerEnd + len(self.AudioMagic) - 4
+
+		if numpy is None:
+			audioData = bytearray(self.AudioSize)
+		else:
+			audioData = numpy.zeros((self.FrameCount, self.ChannelCount, self.FrameSize), dtype=numpy.uint8)
+		paddedCount = self.SamplesPerFrame*self.FrameCount
 		for channel in range(self.ChannelCount):
-			history1, history2 = self.HistorySamples[channel]
-			for i in range(self.FrameCount):
-				start = self.BaseOffset + (i*self.ChannelCount + channel)*(self.FrameSize)
-				filterNum = (self.AudioDataBytes[start] >> 5) & 0xF
-				scale = (self.AudioDataBytes[start] << 8) + self.AudioDataBytes[start+1]
-				if i == 0: #TODO: ....actually I dunno about how I've handled this
-					start += self.FirstOffset // 2
-
-				if EncodingMode(self.EncodingType) == EncodingMode.Fixed:
-					scale = (scale & 0x1FFF) + 1
-				elif EncodingMode(self.EncodingType) == EncodingMode.Exponential:
-					scale = 1 << (12 - scale)
-					assert filterNum == 0
-				else:
-					scale += 1
-					assert filterNum == 0
-				coef1, coef2 = self.Coefficients[filterNum]
-				start += 2
-
-				for j in range(self.SamplesPerFrame-(0 if i else self.FirstOffset)):
-					if start + (j//2) >= self.AudioSize:
-						break
-					# if odd, get low nibble
-					if j % 2:
-						nibble = ((self.AudioDataBytes[start + (j//2)] & 0xF) ^ 0x8) - 0x8
-					# if even, get high nibble
-					else:
-						nibble = (((self.AudioDataBytes[start + (j//2)] >> 4) & 0xF) ^ 0x8) - 0x8
-					delta = nibble * scale
-					prediction = (coef1 * history1 + coef2 * history2) >> 12
-					sample = max(-0x8000, min(0x7FFF, prediction + delta))
-					history2 = history1
-					history1 = sample
-					pcmData[self.ChannelCount*(i*self.SamplesPerFrame + j) + channel] = sample
-		return pcmData
+			samples = pcmData[channel::self.ChannelCount]
+			if numpy is None:
+				samples = list(samples) + [0]*(paddedCount - len(samples))
+				filterNums, headers, scales = self.SearchFramesPython(samples, mode)
+			else:
+				samples = numpy.concatenate((numpy.asarray(samples, dtype=numpy.int64), numpy.zeros(paddedCount - len(samples), dtype=numpy.int64)))
+				filterNums, headers, scales = self.SearchFrames(samples, mode)
+				samples = samples.tolist()
+			nibbles = QuantizeSamples(samples, scales, [self.Coefficients[filterNum] for filterNum in filterNums], self.SamplesPerFrame)
+			if numpy is None:
+				for i, header in enumerate(headers):
+					start = (i*self.ChannelCount + channel)*self.FrameSize
+					audioData[start] = header >> 8
+					audioData[start+1] = header & 0xFF
+					for j in range(start+2, start+self.FrameSize):
+						pos = i*self.SamplesPerFrame + 2*(j - start - 2)
+						audioData[j] = (nibbles[pos] << 4) | nibbles[pos+1]
+			else:
+				headers = numpy.array(headers, dtype=numpy.uint16)
+				nibbles = numpy.frombuffer(nibbles, dtype=numpy.uint8).reshape(-1, 2)
+				audioData[:, channel, 0] = headers >> 8
+				audioData[:, channel, 1] = headers & 0xFF
+				audioData[:, channel, 2:] = ((nibbles[:, 0] << 4) | nibbles[:, 1]).reshape(self.FrameCount, -1)
+		self.AudioDataBytes = bytes(audioData) if numpy is None else audioData.tobytes()
+
+	def FrameHeaders(self, filterNums, needed, mode):
+		# turns the smallest scale each frame can get away with into one the mode can represent
+		if mode == EncodingMode.Exponential:
+			shifts = [max(0, min(12, 12 - (int(need) - 1).bit_length())) for need in needed]
+			return shifts, [1 << (12 - shift) for shift in shifts]
+		scales = [max(1, min(0x2000, int(need))) for need in needed]
+		return [(filterNum << 13) | (scale - 1) for filterNum, scale in zip(filterNums, scales)], scales
+
+	def SearchFrames(self, samples, mode):
+		# residuals against the source itself for every candidate filter at once; the quantization pass reuses the winner
+		history1 = numpy.concatenate(([0], samples[:-1]))
+		history2 = numpy.concatenate(([0, 0], samples[:-2]))
+		coefficients = numpy.array(self.Coefficients, dtype=numpy.int64)
+		predictions = (coefficients[:, 0, None]*history1 + coefficients[:, 1, None]*history2) >> 12
+		residuals = (samples - predictions).reshape(len(coefficients), self.FrameCount, self.SamplesPerFrame)
+		needed = numpy.maximum(-(-residuals.max(axis=2) // 7), -(-(-residuals.min(axis=2)) // 8))
+		needed = numpy.maximum(needed, 1)
+		filterNums = needed.argmin(axis=0)
+		needed = needed[filterNums, numpy.arange(self.FrameCount)]
+		headers, scales = self.FrameHeaders(filterNums.tolist(), needed.tolist(), mode)
+		return filterNums.tolist(), headers, scales
+
+	def SearchFramesPython(self, samples, mode):
+		filterNums = list()
+		needed = list()
+		for i in range(self.FrameCount):
+			best = None
+			for filterNum, (coef1, coef2) in enumerate(self.Coefficients):
+				maxResidual = minResidual = 0
+				for j in range(i*self.SamplesPerFrame, (i+1)*self.SamplesPerFrame):
+					history1 = samples[j-1] if j > 0 else 0
+					history2 = samples[j-2] if j > 1 else 0
+					residual = samples[j] - ((coef1 * history1 + coef2 * history2) >> 12)
+					maxResidual = max(maxResidual, residual)
+					minResidual = min(minResidual, residual)
+				need = max(1, -(-maxResidual // 7), -(minResidual // 8))
+				if best is None or need < best:
+					best = need
+					bestFilter = filterNum
+			filterNums.append(bestFilter)
+			needed.append(best)
+		headers, scales = self.FrameHeaders(filterNums, needed, mode)
+		return filterNums, headers, scales
 
 	def decrypt(self, keycode):
 		self.crypt(keycode)
@@ -238,20 +396,192 @@ class ADX(Serializable):
 		self.crypt(keycode)
 
 	def crypt(self, keycode):
-		keycode -= 1
-		seed = (keycode >> 27) & 0x7FFF
-		mult = ((keycode >> 12) & 0x7FFC) | 1
-		inc = ((keycode << 1) & 0x7FFF) | 1
-		self.AudioDataBytes = list(self.AudioDataBytes)
-		xor = seed
-		for i in range(self.FrameCount*self.ChannelCount):
-			pos = i * self.FrameSize
-			self.AudioDataBytes[pos] ^= ((xor >> 8) & 0xFF)
-			if self.Revision == 9:
-				self.AudioDataBytes[pos] &= 0x1F
-			self.AudioDataBytes[pos+1] ^= (xor & 0xFF)
-			xor = (xor * mult + inc) & 0x7FFF
-		self.AudioDataBytes = bytes(self.AudioDataBytes)
+		# headers are XORed against the keystream one column at a time, straight in the buffer
+		if not isinstance(self.AudioDataBytes, bytearray):
+			self.AudioDataBytes = bytearray(self.AudioDataBytes)
+		frameTotal = self.FrameCount*self.ChannelCount
+		end = frameTotal*self.FrameSize
+		keystream = AdxKeystream(keycode, frameTotal)
+		self.AudioDataBytes[0:end:self.FrameSize] = XorBytes(self.AudioDataBytes[0:end:self.FrameSize], keystream[0::2])
+		if self.Revision == 9:
+			self.AudioDataBytes[0:end:self.FrameSize] = self.AudioDataBytes[0:end:self.FrameSize].translate(Revision9Mask)
+		self.AudioDataBytes[1:end:self.FrameSize] = XorBytes(self.AudioDataBytes[1:end:self.FrameSize], keystream[1::2])
+
+
+Revision9Mask = bytes(i & 0x1F for i in range(256))
+
+
+@functools.lru_cache(maxsize=16)
+def AdxKeystreamCycle(keycode):
+	# the LCG is a bijection on 15 bits, so it repeats after at most 0x8000 steps (always a power of two)
+	seed, mult, inc = KeycodeToLcg(keycode)
+	cycle = bytearray(2*0x8000)
+	xor = seed
+	for i in range(0, len(cycle), 2):
+		cycle[i] = (xor >> 8) & 0xFF
+		cycle[i+1] = xor & 0xFF
+		xor = (xor * mult + inc) & 0x7FFF
+	return bytes(cycle)
+
+
+def AdxKeystream(keycode, frameCount):
+	cycle = AdxKeystreamCycle(keycode)
+	return (cycle * (frameCount // 0x8000 + 1))[:2*frameCount]
+
+
+def XorBytes(data, key):
+	return (int.from_bytes(data, "little") ^ int.from_bytes(key, "little")).to_bytes(len(data), "little")
+
+
+def ToSigned16(value):
+	return value - 0x10000 if value & 0x8000 else value
+
+
+def PredictSamples(deltas, frameCoefficients, sampleCounts, history1, history2, samplesPerFrame):
+	# the only part that can't be vectorized: each sample feeds the prediction for the next two
+	samples = array.array("h", bytes(2*len(deltas)))
+	pos = 0
+	for (coef1, coef2), sampleCount in zip(frameCoefficients, sampleCounts):
+		for i in range(pos, pos + sampleCount):
+			sample = ((coef1 * history1 + coef2 * history2) >> 12) + deltas[i]
+			if sample > 0x7FFF:
+				sample = 0x7FFF
+			elif sample < -0x8000:
+				sample = -0x8000
+			samples[i] = sample
+			history2 = history1
+			history1 = sample
+		pos += samplesPerFrame
+	return samples
+
+
+def QuantizeSamples(samples, frameScales, frameCoefficients, samplesPerFrame):
+	# predicts from the decoded output rather than the source so rounding errors don't pile up
+	nibbles = bytearray(len(samples))
+	history1 = history2 = 0
+	pos = 0
+	for scale, (coef1, coef2) in zip(frameScales, frameCoefficients):
+		for i in range(pos, pos + samplesPerFrame):
+			prediction = (coef1 * history1 + coef2 * history2) >> 12
+			nibble = (2*(samples[i] - prediction) + scale) // (2*scale)
+			if nibble > 7:
+				nibble = 7
+			elif nibble < -8:
+				nibble = -8
+			sample = prediction + nibble*scale
+			if sample > 0x7FFF:
+				sample = 0x7FFF
+			elif sample < -0x8000:
+				sample = -0x8000
+			nibbles[i] = nibble & 0xF
+			history2 = history1
+			history1 = sample
+		pos += samplesPerFrame
+	return nibbles
+
+
+def KeycodeToLcg(keycode):
+	keycode -= 1
+	seed = (keycode >> 27) & 0x7FFF
+	mult = ((keycode >> 12) & 0x7FFC) | 1
+	inc = ((keycode << 1) & 0x7FFF) | 1
+	return seed, mult, inc
+
+
+def LcgToKeycode(seed, mult, inc):
+	return ((seed << 27) | ((mult >> 2) << 14) | (inc >> 1)) + 1
+
+
+def KeySearchProfile(adx, frameLimit, maxScale):
+	# encrypted header words in keystream order, plus which bits of the decrypted header have to come out small
+	frameTotal = min(adx.FrameCount*adx.ChannelCount, frameLimit)
+	frames = numpy.frombuffer(bytes(adx.AudioDataBytes[:frameTotal*adx.FrameSize]), dtype=numpy.uint8).reshape(frameTotal, adx.FrameSize)
+	headers = (frames[:, 0].astype(numpy.int64) << 8) | frames[:, 1]
+	# revision 9 throws the filter bits away, and fixed mode uses them for the filter number
+	scaleMask = 0x1FFF if adx.Revision == 9 or adx.EncodingType == EncodingMode.Fixed.value else 0x7FFF
+	looseBound = 13 if adx.EncodingType == EncodingMode.Exponential.value else 0x1000
+	return headers, scaleMask, min(maxScale, looseBound), looseBound
+
+
+def KeySearchStarts(profiles, frame, lcgMask):
+	values = numpy.arange(lcgMask + 1, dtype=numpy.int64)
+	plausible = numpy.ones(lcgMask + 1, dtype=bool)
+	for headers, scaleMask, tightBound, looseBound in profiles:
+		if frame < len(headers):
+			plausible &= ((headers[frame] ^ values) & scaleMask) < tightBound
+	return values[plausible]
+
+
+def SearchAdxKeySeeds(profiles, seeds, nextValues, tolerance, lcgMask):
+	# every file starts from the seed, so all of them are checked against the same keystream;
+	# the first two frames pin down inc for each (seed, mult, second value), and later frames prune
+	mults = (numpy.arange((lcgMask + 1) >> 2, dtype=numpy.int64) << 2) | 1
+	frameCount = max(len(profile[0]) for profile in profiles)
+	found = list()
+	tested = 0
+	for seed in seeds.tolist():
+		# mult is odd, so inc only comes out odd when the second value has the other parity from the seed
+		seedNextValues = nextValues[(nextValues ^ seed) & 1 == 1]
+		for blockStart in range(0, len(seedNextValues), 64):
+			block = seedNextValues[blockStart:blockStart+64]
+			candMults = numpy.repeat(mults, len(block))
+			values = numpy.tile(block, len(mults))
+			candIncs = (values - seed*candMults) & lcgMask
+			fails = numpy.zeros(len(values), dtype=numpy.int64)
+			scaleSums = numpy.zeros(len(values), dtype=numpy.int64)
+			checks = 0
+			tested += len(values)
+			for frame in range(2, frameCount):
+				values = (values*candMults + candIncs) & lcgMask
+				for headers, scaleMask, tightBound, looseBound in profiles:
+					if frame < len(headers):
+						scales = (headers[frame] ^ values) & scaleMask
+						fails += scales >= looseBound
+						scaleSums += scales
+						checks += 1
+				keep = fails <= int(tolerance*checks)
+				if not keep.all():
+					values, candMults, candIncs, fails, scaleSums = values[keep], candMults[keep], candIncs[keep], fails[keep], scaleSums[keep]
+				if not len(values):
+					break
+			for mult, inc, failCount, scaleSum in zip(candMults.tolist(), candIncs.tolist(), fails.tolist(), scaleSums.tolist()):
+				found.append((LcgToKeycode(seed, mult, inc), 1 - failCount/max(checks, 1), scaleSum/max(checks, 1)))
+	return found, tested
+
+
+def FindAdxKeycodes(adxs, maxScale=0x80, frameLimit=256, tolerance=0.05, jobs=None, printing=True):
+	if numpy is None:
+		raise ImportError("Searching for ADX keycodes requires NumPy.")
+	profiles = [KeySearchProfile(adx, frameLimit, maxScale) for adx in adxs]
+	assert all(len(profile[0]) > 2 for profile in profiles), "Need at least three frames per file to search for a key."
+	# the low bits of an LCG never depend on the high ones, so if only the low 13 bits of each header
+	# can be checked, the top two bits of seed/mult/inc can't be told apart and needn't be searched
+	lcgMask = 0x1FFF if all(profile[1] == 0x1FFF for profile in profiles) else 0x7FFF
+	seeds = KeySearchStarts(profiles, 0, lcgMask)
+	nextValues = KeySearchStarts(profiles, 1, lcgMask)
+
+	jobs = jobs or os.cpu_count() or 1
+	chunkSize = max(1, math.ceil(len(seeds) / (jobs*8)))
+	chunks = [seeds[i:i+chunkSize] for i in range(0, len(seeds), chunkSize)]
+	if printing:
+		print(f"Searching {len(seeds)} seeds x {(lcgMask + 1) >> 2} multipliers x ~{len(nextValues)//2} increments across {jobs} processes...")
+
+	found = list()
+	tested = 0
+	seedsDone = 0
+	startTime = time.perf_counter()
+	with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+		futures = {executor.submit(SearchAdxKeySeeds, profiles, chunk, nextValues, tolerance, lcgMask): len(chunk) for chunk in chunks}
+		for future in concurrent.futures.as_completed(futures):
+			chunkFound, chunkTested = future.result()
+			found.extend(chunkFound)
+			tested += chunkTested
+			seedsDone += futures[future]
+			if printing:
+				elapsed = time.perf_counter() - startTime
+				print(f"[{seedsDone}/{len(seeds)} seeds] {tested:,} candidates in {elapsed:.1f}s ({tested/max(elapsed, 1e-9):,.0f}/s), {len(found)} plausible so far")
+	# real audio favours small scales, so the true key should have the lowest mean
+	return sorted(found, key=lambda candidate: (candidate[2], -candidate[1]))
 
 
 class EncodingMode(Enum):
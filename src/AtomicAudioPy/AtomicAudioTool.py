@@ -1,4 +1,6 @@
 import argparse
+import csv
+import json
 import os
 
 import xml.etree.ElementTree as ET
@@ -6,14 +8,15 @@ import xml.etree.ElementTree as ET
 from pathlib import Path
 
 from ACB import ACB, ExtEncode
-from ADX import ADX
+from ADX import ADX, EncodingMode, FindAdxKeycodes
 from HCA import HCA
 from UTFAFS import UTF
+from WAVE import WAVE
 
 def main():
 
 	parser = argparse.ArgumentParser(prog="AtomicAudioTool", description="Basic editing utility for Cri ACB project files.")
-	subparsers = parser.add_subparsers(dest="action", help="Specify whether you want to do print_info, to_xml, extract_audio, replace_waveform, or add_simple_cue.")
+	subparsers = parser.add_subparsers(dest="action", help="Specify whether you want to do print_info, to_xml, extract_audio, impact, replace_waveform, replace_waveforms, add_simple_cue, add_simple_cues, or find_adx_key.")
 
 	info_parser = subparsers.add_parser("print_info", help="Print detailed information about the cues inside the ACB.")
 	info_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to print.")
@@ -29,39 +32,84 @@ def main():
 	extract_parser.add_argument("--output-directory", required=False, help="Optional output directory for extracted audio, which will be created if it doesn't already exist. If not provided, will create a directory of the same base path + name as the input ACB.")
 	extract_parser.add_argument("--name-by-cue", action=argparse.BooleanOptionalAction, help="If provided, will name extracted audio files by cue and track numbers. Otherwise, will name by AWB IDs.")
 	extract_parser.add_argument("--key-code", type=int, required=False, help="If provided, will decrypt extracted ADX files.")
-	#extract_parser.add_argument("--output-format", required=False, help="If provided, will try to convert the extracted files to the specified audio format.")
+	extract_parser.add_argument("--output-format", required=False, help="If provided, will try to convert the extracted files to the specified audio format. Accepted values: WAV")
+	extract_parser.add_argument("--jobs", type=int, required=False, help="If provided, will write out the extracted files with this many processes.")
 	extract_parser.add_argument("--print-info", action=argparse.BooleanOptionalAction, help="If provided, will print ACB info alongside extraction")
 
+	impact_parser = subparsers.add_parser("impact", help="List the cues that would be affected by replacing the waveform at the given AWB ID.")
+	impact_parser.add_argument("--awb-id", type=int, required=True, help="AWB ID of waveform to look up.")
+	impact_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to look in.")
+	impact_parser.add_argument("--input-awb-path", required=False, help="Path to streaming AWB file. If provided, will look up the AWB ID in the external (streaming) AWB, like replace_waveform does. Otherwise, will look it up in the in-memory AWB inside the ACB.")
+
 	wave_parser = subparsers.add_parser("replace_waveform", help="Use the provided audio file to replace the waveform at the given AWB ID. Currently only supports ADX.")
 	wave_parser.add_argument("--awb-id", type=int, required=True, help="AWB ID of waveform to be replaced.")
 	wave_parser.add_argument("--new-audio-type", required=False, default="ADX", help="Name of the audio format of the new file. Accepted values: {}".format(", ".join(x.name for x in ExtEncode)))
 	wave_parser.add_argument("--new-audio-path", required=True, help="Path to audio file that will replace existing one.")
-	#wave_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio file to ADX.")
-	wave_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input ADX file.") # (whether ADX at source or converted via --convert-input).")
+	wave_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio file (currently only 8-bit or 16-bit PCM WAVE) to ADX, or to HCA if --new-audio-type is HCA.")
+	wave_parser.add_argument("--encoding-mode", required=False, default="Linear", help="ADX encoding mode to use with --convert-input. Accepted values: Fixed, Linear, Exponential")
+	wave_parser.add_argument("--bitrate", type=int, required=False, help="HCA bitrate in kbps to use with --convert-input. If omitted, will use 128 kbps per channel.")
+	wave_parser.add_argument("--jobs", type=int, required=False, help="If provided, will encode HCA with --convert-input using this many processes.")
+	wave_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input ADX file (whether ADX at source or converted via --convert-input).")
 	wave_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to modify.")
 	wave_parser.add_argument("--input-awb-path", required=False, help="Path to streaming AWB file to modify. If provided, will try to add audio to the external (streaming) AWB. Otherwise, will try to add to the in-memory AWB inside the ACB.")
 	wave_parser.add_argument("--output-acb-path", required=False, help="Optional path to modified ACB file. If omitted, will modify input ACB in place.")
 	wave_parser.add_argument("--output-awb-path", required=False, help="Optional path to modified streaming AWB file. If omitted, will modify input AWB in place.")
 
+	waves_parser = subparsers.add_parser("replace_waveforms", help="Replace the waveforms at all the AWB IDs listed in a manifest, writing the ACB and AWB out once at the end.")
+	waves_parser.add_argument("--manifest", required=True, help="Path to a CSV (with a header row) or JSON (a list of objects) manifest with awb_id and path columns, and optionally type to override --new-audio-type. Relative paths are relative to the manifest.")
+	waves_parser.add_argument("--new-audio-type", required=False, default="ADX", help="Name of the audio format of the new files, where the manifest doesn't say. Accepted values: {}".format(", ".join(x.name for x in ExtEncode)))
+	waves_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio files (currently only 8-bit or 16-bit PCM WAVE) to ADX, or to HCA if their type is HCA.")
+	waves_parser.add_argument("--encoding-mode", required=False, default="Linear", help="ADX encoding mode to use with --convert-input. Accepted values: Fixed, Linear, Exponential")
+	waves_parser.add_argument("--bitrate", type=int, required=False, help="HCA bitrate in kbps to use with --convert-input. If omitted, will use 128 kbps per channel.")
+	waves_parser.add_argument("--jobs", type=int, required=False, help="If provided, will encode HCA with --convert-input using this many processes.")
+	waves_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input files (whether ADX or HCA at source or converted via --convert-input).")
+	waves_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to modify.")
+	waves_parser.add_argument("--input-awb-path", required=False, help="Path to streaming AWB file to modify. If provided, will replace audio in the external (streaming) AWB. Otherwise, will replace audio in the in-memory AWB inside the ACB.")
+	waves_parser.add_argument("--output-acb-path", required=False, help="Optional path to modified ACB file. If omitted, will modify input ACB in place.")
+	waves_parser.add_argument("--output-awb-path", required=False, help="Optional path to modified streaming AWB file. If omitted, will modify input AWB in place.")
+
 	cue_parser = subparsers.add_parser("add_simple_cue", help="Use the provided audio file to create a new AWB entry and a simple cue that points to it.")
 	cue_parser.add_argument("--cue-name", required=False, help="Name of cue to be added. If omitted, will default to \"Cue{cue_id}\".")
 	cue_parser.add_argument("--cue-id", type=int, required=False, help="Cue ID of new cue. If omitted, will pick next available ID.")
 	cue_parser.add_argument("--new-audio-type", required=False, default="ADX", help="Name of the audio format of the new file. Accepted values: {}".format(", ".join(x.name for x in ExtEncode)))
 	cue_parser.add_argument("--new-audio-path", required=True, help="Path to audio file that will replace existing one.")
-	#cue_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio file to ADX.")
-	cue_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input ADX file.") # (whether ADX at source or converted via --convert-input).")
+	cue_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio file (currently only 8-bit or 16-bit PCM WAVE) to ADX, or to HCA if --new-audio-type is HCA.")
+	cue_parser.add_argument("--encoding-mode", required=False, default="Linear", help="ADX encoding mode to use with --convert-input. Accepted values: Fixed, Linear, Exponential")
+	cue_parser.add_argument("--bitrate", type=int, required=False, help="HCA bitrate in kbps to use with --convert-input. If omitted, will use 128 kbps per channel.")
+	cue_parser.add_argument("--jobs", type=int, required=False, help="If provided, will encode HCA with --convert-input using this many processes.")
+	cue_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input ADX file (whether ADX at source or converted via --convert-input).")
 	cue_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to modify.")
 	cue_parser.add_argument("--input-awb-path", required=False, help="Path to streaming AWB file to modify. If provided, will try to add audio to the external (streaming) AWB. Otherwise, will try to add to the in-memory AWB inside the ACB.")
 	cue_parser.add_argument("--output-acb-path", required=False, help="Optional path to modified ACB file. If omitted, will modify input ACB in place.")
 	cue_parser.add_argument("--output-awb-path", required=False, help="Optional path to modified streaming AWB file. If omitted, will modify input AWB in place.")
 
+	cues_parser = subparsers.add_parser("add_simple_cues", help="Create a new AWB entry and a simple cue for every audio file listed in a manifest, writing the ACB and AWB out once at the end.")
+	cues_parser.add_argument("--manifest", required=True, help="Path to a CSV (with a header row) or JSON (a list of objects) manifest with a path column, and optionally cue_name, cue_id, and type to override --new-audio-type. Relative paths are relative to the manifest. Cues without a name or ID get them picked as in add_simple_cue.")
+	cues_parser.add_argument("--new-audio-type", required=False, default="ADX", help="Name of the audio format of the new files, where the manifest doesn't say. Accepted values: {}".format(", ".join(x.name for x in ExtEncode)))
+	cues_parser.add_argument("--convert-input", action=argparse.BooleanOptionalAction, help="If provided, will convert input audio files (currently only 8-bit or 16-bit PCM WAVE) to ADX, or to HCA if their type is HCA.")
+	cues_parser.add_argument("--encoding-mode", required=False, default="Linear", help="ADX encoding mode to use with --convert-input. Accepted values: Fixed, Linear, Exponential")
+	cues_parser.add_argument("--bitrate", type=int, required=False, help="HCA bitrate in kbps to use with --convert-input. If omitted, will use 128 kbps per channel.")
+	cues_parser.add_argument("--jobs", type=int, required=False, help="If provided, will encode HCA with --convert-input using this many processes.")
+	cues_parser.add_argument("--key-code", type=int, required=False, help="If provided, will encrypt input files (whether ADX or HCA at source or converted via --convert-input).")
+	cues_parser.add_argument("--input-acb-path", required=True, help="Path to ACB file to modify.")
+	cues_parser.add_argument("--input-awb-path", required=False, help="Path to streaming AWB file to modify. If provided, will add audio to the external (streaming) AWB. Otherwise, will add to the in-memory AWB inside the ACB.")
+	cues_parser.add_argument("--output-acb-path", required=False, help="Optional path to modified ACB file. If omitted, will modify input ACB in place.")
+	cues_parser.add_argument("--output-awb-path", required=False, help="Optional path to modified streaming AWB file. If omitted, will modify input AWB in place.")
+
+	key_parser = subparsers.add_parser("find_adx_key", help="Search for the keycode of one or more encrypted ADX files.")
+	key_parser.add_argument("--input-adx-paths", nargs="+", required=True, help="Paths to encrypted ADX files that all share the same key. More files narrow the search down faster.")
+	key_parser.add_argument("--max-scale", type=int, required=False, default=128, help="Largest scale the first two frames of each file are assumed to have once decrypted. Files that start in near-silence can use a small value, which makes the search much faster.")
+	key_parser.add_argument("--frames", type=int, required=False, default=256, help="Number of frame headers per file to test each candidate key against.")
+	key_parser.add_argument("--jobs", type=int, required=False, help="Number of processes to search with. Defaults to the number of CPUs.")
+	key_parser.add_argument("--top", type=int, required=False, default=5, help="Number of best candidate keycodes to list at the end.")
+
 	args = parser.parse_args()
 	if args.action == "print_info":
 		acb = ACB(args.input_acb_path, awbPath=args.input_awb_path)
 		acb.PrettyPrint()
 	elif args.action == "to_xml":
 		utf = UTF()
-		utf.read(args.input_utf)
+		utf.read_mapped(args.input_utf)
 		root = utf.to_xml()
 		ET.indent(root, space='  ', level=0)
 		if args.output_xml:
@@ -74,44 +122,113 @@ def main():
 		if args.output_directory is None:
 			args.output_directory = str(Path(args.input_acb_path).with_suffix(""))
 		os.makedirs(args.output_directory, exist_ok=True)
-		acb.Extract(args.output_directory, keycode=args.key_code, printing=args.print_info, nameByCue=args.name_by_cue)
-	elif args.action == "replace_waveform" or args.action == "add_simple_cue":
+		acb.Extract(args.output_directory, keycode=args.key_code, outputFormat=args.output_format, printing=args.print_info, nameByCue=args.name_by_cue, jobs=args.jobs)
+	elif args.action == "impact":
 		acb = ACB(args.input_acb_path, awbPath=args.input_awb_path)
-
+		streaming = args.input_awb_path is not None
+		cueIds = acb.GetAwbIdCues(args.awb_id, streaming)
+		if not cueIds:
+			print("No cues refer to {} AWB ID {}.".format("streamed" if streaming else "in-memory", args.awb_id))
+		for cueId in cueIds:
+			if cueId in acb.CueId2CueNameRow:
+				cueName = acb.Tables["CueName"].GetRowField(acb.CueId2CueNameRow[cueId], "CueName").Value.Value
+				print(f"Cue #{cueId}: {cueName}")
+			else:
+				print(f"Cue #{cueId}")
+	elif args.action == "find_adx_key":
+		adxs = list()
+		for path in args.input_adx_paths:
+			adx = ADX()
+			adx.read(path)
+			adxs.append(adx)
+		candidates = FindAdxKeycodes(adxs, maxScale=args.max_scale, frameLimit=args.frames, jobs=args.jobs)
+		if not candidates:
+			print("No keycode found. Try a larger --max-scale.")
+		for keycode, score, meanScale in candidates[:args.top]:
+			print(f"{keycode}\t{score:.1%} of frame headers plausible, mean scale {meanScale:.1f}")
+	elif args.action in ("replace_waveform", "replace_waveforms", "add_simple_cue", "add_simple_cues"):
 		if args.output_acb_path is None:
 			args.output_acb_path = args.input_acb_path
 		if args.output_awb_path is None:
 			args.output_awb_path = args.input_awb_path
 
+		acb = ACB(args.input_acb_path, awbPath=args.input_awb_path)
+
 		streaming = args.input_awb_path is not None
 		awb = acb.StreamAwbStruct if streaming else acb.MemoryAwbStruct
 
-		with open(args.new_audio_path, "rb") as f:
-			inputBytes = f.read()
-
-		if args.key_code is not None:
-			if args.new_audio_type == "ADX":
-				adx = ADX()
-				adx.frombytes(inputBytes)
-				adx.encrypt(args.key_code, codingType=9)
-				inputBytes = adx.tobytes()
-			elif args.new_audio_type == "HCA":
-				hca = HCA()
-				hca.frombytes(inputBytes)
-				hca.Crypt(args.key_code * ((awb.Key << 16) | ((~awb.Key + 2) + 2**16)))
-				inputBytes = hca.tobytes()
-
-		if args.action == "replace_waveform":
-			acb.ReplaceWaveform(args.awb_id, streaming, inputBytes, replacementType=ExtEncode[args.new_audio_type].value)
-		elif args.action == "add_simple_cue":
-			acb.AddWaveformAndCue(streaming, inputBytes, args.new_audio_type, args.cue_name, args.cue_id)
-
-		acb.AcbStruct.write_right(args.output_acb_path)
-		if args.output_awb_path is not None:
-			acb.StreamAwbStruct.write_right(args.output_awb_path)
+		if args.action == "replace_waveforms":
+			# everything goes in before the offsets, AWB header and hash get redone, once
+			with acb.Batch():
+				for entry in ReadManifest(args.manifest):
+					inputBytes, audioType = PrepareAudio(entry["path"], entry.get("type") or args.new_audio_type, args, awb)
+					acb.ReplaceWaveform(int(entry["awb_id"]), streaming, inputBytes, replacementType=ExtEncode[audioType].value)
+		elif args.action == "add_simple_cues":
+			newCues = list()
+			for entry in ReadManifest(args.manifest):
+				inputBytes, audioType = PrepareAudio(entry["path"], entry.get("type") or args.new_audio_type, args, awb)
+				cueId = entry.get("cue_id")
+				newCues.append((inputBytes, audioType, entry.get("cue_name") or None, None if cueId is None or cueId == "" else int(cueId)))
+			for cueId, cueNameRow in acb.AddWaveformsAndCues(streaming, newCues):
+				print(f"Added cue #{cueId}")
+		else:
+			inputBytes, audioType = PrepareAudio(args.new_audio_path, args.new_audio_type, args, awb)
+			if args.action == "replace_waveform":
+				acb.ReplaceWaveform(args.awb_id, streaming, inputBytes, replacementType=ExtEncode[audioType].value)
+			elif args.action == "add_simple_cue":
+				acb.AddWaveformAndCue(streaming, inputBytes, audioType, args.cue_name, args.cue_id)
+
+		acb.Write(args.output_acb_path, args.output_awb_path)
 	else:
 		raise ValueError("Command not recognized. Must be replace_waveform or add_simple_cue.")
 
 
+# reads, and if asked converts and encrypts, one new audio file
+def PrepareAudio(path, audioType, args, awb):
+	with open(path, "rb") as f:
+		inputBytes = f.read()
+
+	if args.convert_input:
+		wave = WAVE()
+		wave.frombytes(inputBytes)
+		if audioType == "HCA":
+			hca = HCA(channelCount=wave.NumChannels, sampleRate=wave.SampleRate)
+			hca.encode(wave.decode(), bitrate=None if args.bitrate is None else args.bitrate*1000, jobs=args.jobs)
+			inputBytes = hca.tobytes()
+		else:
+			adx = ADX(encodingType=EncodingMode[args.encoding_mode].value, channelCount=wave.NumChannels, sampleRate=wave.SampleRate)
+			adx.encode(wave.decode())
+			inputBytes = adx.tobytes()
+			audioType = "ADX"
+
+	if args.key_code is not None:
+		if audioType == "ADX":
+			adx = ADX()
+			adx.frombytes(inputBytes)
+			adx.encrypt(args.key_code, codingType=9)
+			inputBytes = adx.tobytes()
+		elif audioType == "HCA":
+			hca = HCA()
+			hca.frombytes(inputBytes)
+			hca.Crypt(args.key_code * ((awb.Key << 16) | ((~awb.Key + 2) + 2**16)))
+			inputBytes = hca.tobytes()
+
+	return inputBytes, audioType
+
+
+# a list of dicts, from either a JSON list of objects or a CSV with a header row
+def ReadManifest(path):
+	if Path(path).suffix.lower() == ".json":
+		with open(path, "r", encoding="utf-8") as f:
+			entries = json.load(f)
+	else:
+		with open(path, "r", newline="", encoding="utf-8-sig") as f:
+			entries = list(csv.DictReader(f))
+	base = Path(path).parent
+	for entry in entries:
+		entry["path"] = str(base / entry["path"])
+	return entries
+
+
 if __name__ == "__main__":
 	main()
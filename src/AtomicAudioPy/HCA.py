@@ -1,18 +1,28 @@
+import concurrent.futures
+import functools
+import math
+
+from enum import Enum
 
 from exbip.Serializable import Serializable
 from exbip.BinaryTargets.Interface.Base import EndiannessManager
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 
 class HCA(Serializable):
 
-	def __init__(self):
+	def __init__(self, channelCount=1, sampleRate=44100):
 
 		self.Header				= None
 		self.CheckSum			= None
 		self.Data				= None
 
-		self.ChannelCount		= None
-		self.SampleRate			= None
+		self.ChannelCount		= channelCount
+		self.SampleRate			= sampleRate
 		self.SampleCount		= None
 		self.Duration			= None
 		self.FrameCount			= None
@@ -22,45 +32,45 @@ class HCA(Serializable):
 		self.LoopEndSample		= None
 
 	def update_offsets(self):
-		self.tobytes()
+		self.calcsize()
 
 	def write_right(self, path):
 		self.update_offsets()
 		self.write(path)
 
-	def __rw_hook__(self, rw):
+	def __rw_hook__(self, rw, headerOnly=False):
 
 		with EndiannessManager(rw, ">"):
 
 			self.Header = rw.rw_obj(self.Header, HCAHeader)
 
-			checksum = CRC16().Compute(self.Header.tobytes(), self.Header.HeaderSize-2)
+			checksum = HcaCrc.Compute(self.Header.tobytes(), self.Header.HeaderSize-2)
 			if rw.is_parselike:
 				self.CheckSum = checksum
 			self.CheckSum = rw.rw_uint16(self.CheckSum)
 			assert self.CheckSum == checksum
 			assert rw.tell() == self.Header.HeaderSize
 
-			self.Data = rw.rw_bytestring(self.Data, self.Header.FmtChunk.FrameCount*self.Header.CompChunk.FrameSize)
-			assert len(self.Data) == self.Header.FmtChunk.FrameCount*self.Header.CompChunk.FrameSize
+			frameSize = (self.Header.CompChunk or self.Header.DecChunk).FrameSize
+			if not headerOnly:
+				self.Data = rw.rw_bytestring(self.Data, self.Header.FmtChunk.FrameCount*frameSize)
+				assert len(self.Data) == self.Header.FmtChunk.FrameCount*frameSize
 
 		self.ChannelCount	= self.Header.FmtChunk.ChannelCount
 		self.SampleRate		= self.Header.FmtChunk.SampleRate
 		self.SampleCount	= self.Header.FmtChunk.SampleCount
 		self.Duration		= int(1000*self.SampleCount/self.SampleRate)
 		self.FrameCount		= self.Header.FmtChunk.FrameCount
-		self.FrameSize		= self.Header.CompChunk.FrameSize
+		self.FrameSize		= frameSize
 		self.LoopCount		= None if self.Header.LoopChunk is None else 1
 		if self.LoopCount:
-			self.LoopStartSample	= self.Header.LoopChunk.LoopStartSample
-			self.LoopEndSample		= self.Header.LoopChunk.LoopEndSample
+			insertedSamples = self.Header.FmtChunk.InsertedSamples
+			self.LoopStartSample	= self.Header.LoopChunk.LoopStartFrame*1024 + self.Header.LoopChunk.PreLoopSamples - insertedSamples
+			self.LoopEndSample		= (self.Header.LoopChunk.LoopEndFrame+1)*1024 - self.Header.LoopChunk.PostLoopSamples - insertedSamples
 
-		crc = CRC16()
-		for i in range(self.FrameCount):
-			frame = self.Data[i*self.FrameSize:(i+1)*self.FrameSize]
-			assert len(frame) == self.FrameSize
-			if crc.Compute(frame, len(frame)-2) != (frame[-2] << 8) | frame[-1]:
-				raise ValueError(f"Checksum for frame {i} is invalid.")
+		# frame checksums are left to VerifyFrames, so just reading the metadata stays cheap
+		if headerOnly:
+			return
 
 		failed = False
 		try:
@@ -70,6 +80,70 @@ class HCA(Serializable):
 			remainder = rw.peek_bytestream(64)
 			print(len(remainder), remainder)
 
+	def Frame(self, index):
+		return memoryview(self.Data)[index*self.FrameSize:(index+1)*self.FrameSize]
+
+	def Frames(self, start=0, stop=None):
+		view = memoryview(self.Data)
+		for i in range(start, self.FrameCount if stop is None else stop):
+			yield view[i*self.FrameSize:(i+1)*self.FrameSize]
+
+	def VerifyFrame(self, index):
+		# a frame's CRC run over its own checksum comes out to 0
+		return HcaCrc.Compute(self.Frame(index), self.FrameSize) == 0
+
+	def VerifyFrames(self, start=0, stop=None):
+		stop = self.FrameCount if stop is None else stop
+		view = memoryview(self.Data)[start*self.FrameSize:stop*self.FrameSize]
+		for i, crc in enumerate(HcaCrc.ComputeFrames(view, self.FrameSize, stop - start)):
+			if crc != 0:
+				raise ValueError(f"Checksum for frame {start + i} is invalid.")
+
+	def DecodeFrames(self, batchSize=64):
+		# yields interleaved int16 PCM one frame at a time, already trimmed of encoder delay and padding
+		if self.Header.CiphChunk is not None and self.Header.CiphChunk.EncryptionType != 0:
+			raise ValueError("HCA is encrypted; decrypt it with its keycode before decoding.")
+		decoder = HCADecoder(self.Header)
+		skip = self.Header.FmtChunk.InsertedSamples
+		remaining = self.SampleCount
+		for batchStart in range(0, self.FrameCount, batchSize):
+			batchEnd = min(batchStart + batchSize, self.FrameCount)
+			self.VerifyFrames(batchStart, batchEnd)
+			for pcmData in decoder.DecodeFrames(list(self.Frames(batchStart, batchEnd))):
+				pcmData = pcmData[skip:skip+remaining]
+				skip = max(0, skip - HCADecoder.SamplesPerFrame)
+				remaining -= len(pcmData)
+				if len(pcmData):
+					yield pcmData.reshape(-1)
+
+	def decode(self):
+		frames = list(self.DecodeFrames())
+		if not frames:
+			return numpy.zeros(0, dtype=numpy.int16)
+		return numpy.concatenate(frames)
+
+	def encode(self, pcmData, bitrate=None, loopStart=None, loopEnd=None, jobs=1):
+		# pcmData is interleaved signed 16-bit samples, laid out the same way decode() returns them
+		encoder = HCAEncoder(self.ChannelCount, self.SampleRate, bitrate)
+		sampleCount = len(pcmData) // self.ChannelCount
+		frameCount = math.ceil((HCAEncoder.InsertedSamples + sampleCount) / HCADecoder.SamplesPerFrame)
+
+		# the last subframe's window reaches half a subframe past the end of the last frame
+		samples = numpy.zeros((self.ChannelCount, frameCount*HCADecoder.SamplesPerFrame + HCADecoder.SamplesPerSubframe))
+		pcmData = numpy.asarray(pcmData[:sampleCount*self.ChannelCount], dtype=numpy.float64)
+		samples[:, HCAEncoder.InsertedSamples:HCAEncoder.InsertedSamples+sampleCount] = pcmData.reshape(sampleCount, self.ChannelCount).T / 32768
+
+		self.Header = encoder.CreateHeader(frameCount, sampleCount, loopStart, loopEnd)
+		self.Data = encoder.EncodeFrames(samples, jobs)
+
+		self.SampleCount	= self.Header.FmtChunk.SampleCount
+		self.Duration		= int(1000*self.SampleCount/self.SampleRate)
+		self.FrameCount		= frameCount
+		self.FrameSize		= encoder.FrameSize
+		self.LoopCount		= None if loopStart is None else 1
+		self.LoopStartSample	= loopStart
+		self.LoopEndSample		= loopEnd
+
 	def Crypt(self, keycode=None):
 		# encrypt
 		if self.Header.CiphChunk is None or self.Header.CiphChunk.EncryptionType == 0:
@@ -302,7 +376,7 @@ class DecChunk(Serializable):
 		self.TotalBandCount		= self._totalBandCount + 1
 
 		if rw.is_parselike:
-			self._baseBandCount = self._baseBandCount - 1
+			self._baseBandCount = self.BaseBandCount - 1
 		self._baseBandCount		= rw.rw_uint8(self._baseBandCount)
 		self.BaseBandCount		= self._baseBandCount + 1
 
@@ -450,6 +524,14 @@ class CRC16:
 
 	def __init__(self, polynomial=0x8005):
 		self.Table = self.GenerateTable(polynomial)
+		# Tables[k][b] is the CRC of byte b followed by k zero bytes, so eight bytes can be folded in per step
+		self.Tables = [self.Table]
+		for k in range(1, 8):
+			self.Tables.append([((crc << 8) ^ self.Table[crc >> 8]) & 0xFFFF for crc in self.Tables[-1]])
+		self.ArrayTables = None
+		self.PositionTables = dict()
+		if numpy is not None:
+			self.ArrayTables = numpy.array(self.Tables, dtype=numpy.uint16)
 
 	def GenerateTable(self, polynomial):
 		table = list()
@@ -464,11 +546,43 @@ class CRC16:
 		return table
 
 	def Compute(self, data, size):
+		t0, t1, t2, t3, t4, t5, t6, t7 = self.Tables
 		crc = 0
-		for i in range(size):
-			crc = ((crc << 8) ^ self.Table[(crc >> 8) ^ data[i]]) & 0xFFFF
+		end = size - size % 8
+		for d0, d1, d2, d3, d4, d5, d6, d7 in zip(*(data[i:end:8] for i in range(8))):
+			crc = t7[(crc >> 8) ^ d0] ^ t6[(crc & 0xFF) ^ d1] ^ t5[d2] ^ t4[d3] ^ t3[d4] ^ t2[d5] ^ t1[d6] ^ t0[d7]
+		for i in range(end, size):
+			crc = ((crc << 8) ^ t0[(crc >> 8) ^ data[i]]) & 0xFFFF
 		return crc
 
+	def PositionTable(self, frameSize):
+		# row k is the CRC of each byte value followed by the frameSize-1-k bytes after it, which lets a
+		# frame's CRC be computed as the XOR of one lookup per byte, with no dependency between them
+		if frameSize not in self.PositionTables:
+			table = numpy.zeros((frameSize, 256), dtype=numpy.uint16)
+			table[-1] = self.ArrayTables[0]
+			for k in range(frameSize-2, -1, -1):
+				table[k] = (table[k+1] << 8) ^ self.ArrayTables[0][table[k+1] >> 8]
+			self.PositionTables[frameSize] = table.ravel()
+		return self.PositionTables[frameSize]
+
+	def ComputeFrames(self, data, frameSize, frameCount, size=None, batchSize=256):
+		# one CRC per frame (over its first size bytes, if given), for all equal-size frames at once
+		size = frameSize if size is None else size
+		if numpy is None:
+			return [self.Compute(data[i*frameSize:i*frameSize+size], size) for i in range(frameCount)]
+		frames = numpy.frombuffer(data, dtype=numpy.uint8, count=frameCount*frameSize).reshape(frameCount, frameSize)[:, :size]
+		table = self.PositionTable(size)
+		offsets = numpy.arange(size) * 256
+		crcs = numpy.empty(frameCount, dtype=numpy.uint16)
+		for start in range(0, frameCount, batchSize):
+			crcs[start:start+batchSize] = numpy.bitwise_xor.reduce(table[offsets + frames[start:start+batchSize]], axis=1)
+		return crcs.tolist()
+
+
+# every HCA checksum uses the same polynomial, so the tables only need building once
+HcaCrc = CRC16()
+
 
 class HCAKey:
 
@@ -476,12 +590,18 @@ class HCAKey:
 		assert keytype == 0 or keytype == 1 or keytype == 56
 		self.KeyCode = keycode
 		self.KeyType = keytype
-		self.BaseTable = self.GenerateBaseTable()
-		self.DecryptionTable = self.GenerateTable(keytype, keycode)
-		self.EncryptionTable = self.InvertTable(self.DecryptionTable)
-		self.Crc = CRC16()
-
-	def GenerateBaseTable(self):
+		self.DecryptionTable, self.EncryptionTable = self.GetTables(keytype, keycode)
+
+	@staticmethod
+	@functools.lru_cache(maxsize=64)
+	def GetTables(keytype, keycode):
+		# a whole bank usually shares one key, so each table only gets generated once
+		decryptionTable = HCAKey.GenerateTable(keytype, keycode)
+		return bytes(decryptionTable), bytes(HCAKey.InvertTable(decryptionTable))
+
+	@staticmethod
+	@functools.lru_cache(maxsize=None)
+	def GenerateBaseTable():
 		table = list()
 		for i in range(256):
 			table.append(list())
@@ -493,11 +613,12 @@ class HCAKey:
 				table[-1].append(xor & 0xFF)
 		return table
 
-	def GenerateTable(self, keytype, keycode):
+	@staticmethod
+	def GenerateTable(keytype, keycode):
 		if keytype == 0:
 			return list(range(256))
 		elif keytype == 1:
-			table = list()
+			table = [0]*256
 			xor = 0
 			mult = 13
 			inc = 11
@@ -531,9 +652,10 @@ class HCAKey:
 				kc[6],
 			]
 			table1 = [0]*256
-			row = self.BaseTable[rowSeed]
+			baseTable = HCAKey.GenerateBaseTable()
+			row = baseTable[rowSeed]
 			for r in range(16):
-				col = self.BaseTable[columnSeeds[r]]
+				col = baseTable[columnSeeds[r]]
 				for c in range(16):
 					table1[16 * r + c] = (row[r] << 4) | col[c]
 			# shuffle time
@@ -549,30 +671,578 @@ class HCAKey:
 			table2[255] = 255
 			return table2
 
-	def InvertTable(self, table1):
+	@staticmethod
+	def InvertTable(table1):
 		table2 = [0]*len(table1)
 		for i in range(len(table1)):
 			table2[table1[i]] = i
 		return table2
 
 	def Encrypt(self, hca):
-		hca.Data = bytes(self.Crypt(hca, self.EncryptionTable))
-		hca.Header.CiphChunk.EncryptionType = self.KeyType
+		hca.Data = self.Crypt(hca, self.EncryptionTable)
 		hca.Header.CiphChunk.EncryptionType = self.KeyType
 		hca.Header.EncryptChunks()
 
 	def Decrypt(self, hca):
-		hca.Data = bytes(self.Crypt(hca, self.DecryptionTable))
+		hca.Data = self.Crypt(hca, self.DecryptionTable)
 		hca.Header.CiphChunk.EncryptionType = 0
 		hca.Header.DecryptChunks()
 
 	def Crypt(self, hca, table):
-		data = [0]*len(hca.Data)
-		for i in range(hca.FrameCount):
-			for j in range(hca.FrameSize-2):
-				pos = i*hca.FrameSize + j
-				data[pos] = table[hca.Data[pos]]
-			crc = self.Crc.Compute(data[i*hca.FrameSize:(i+1)*hca.FrameSize], hca.FrameSize-2)
+		# substitute the whole stream in one go, then patch every frame's checksum back over its last two bytes
+		data = bytearray(bytes(hca.Data).translate(table))
+		crcs = HcaCrc.ComputeFrames(data, hca.FrameSize, hca.FrameCount, hca.FrameSize-2)
+		for i, crc in enumerate(crcs):
 			data[(i+1)*hca.FrameSize - 2] = (crc >> 8) & 0xFF
 			data[(i+1)*hca.FrameSize - 1] = crc & 0xFF
-		return data
+		return bytes(data)
+
+
+class ChannelType(Enum):
+	Discrete		= 0
+	StereoPrimary	= 1
+	StereoSecondary	= 2
+
+
+class HCADecoder:
+
+	SubframeCount = 8
+	SamplesPerSubframe = 128
+	SamplesPerFrame = SubframeCount * SamplesPerSubframe
+
+	# bits that a code at each resolution can take up; the prefix codes for resolutions 1-7 can use fewer
+	MaxBits = [0, 2, 3, 3, 4, 4, 4, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+	PrefixBits = [
+		0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+		1, 1, 2, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+		2, 2, 2, 2, 2, 2, 3, 3, 0, 0, 0, 0, 0, 0, 0, 0,
+		2, 2, 3, 3, 3, 3, 3, 3, 0, 0, 0, 0, 0, 0, 0, 0,
+		3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 4, 4,
+		3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4,
+		3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4,
+		3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4,
+	]
+	PrefixValues = [
+		0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+		0, 0, 1, -1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+		0, 0, 1, 1, -1, -1, 2, -2, 0, 0, 0, 0, 0, 0, 0, 0,
+		0, 0, 1, -1, 2, -2, 3, -3, 0, 0, 0, 0, 0, 0, 0, 0,
+		0, 0, 1, 1, -1, -1, 2, 2, -2, -2, 3, 3, -3, -3, 4, -4,
+		0, 0, 1, 1, -1, -1, 2, 2, -2, -2, 3, -3, 4, -4, 5, -5,
+		0, 0, 1, 1, -1, -1, 2, -2, 3, -3, 4, -4, 5, -5, 6, -6,
+		0, 0, 1, -1, 2, -2, 3, -3, 4, -4, 5, -5, 6, -6, 7, -7,
+	]
+	# resolution for each position on the noise curve; anything past the end is 0
+	InvertTable = [
+		14, 14, 14, 14, 14, 14, 13, 13, 13, 13, 13, 13, 12, 12, 12, 12,
+		12, 12, 11, 11, 11, 11, 11, 11, 10, 10, 10, 10, 10, 10, 10, 9,
+		9, 9, 9, 9, 9, 8, 8, 8, 8, 8, 8, 7, 6, 6, 5, 4,
+		4, 4, 3, 3, 3, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1,
+		1, 1,
+	]
+	# threshold of hearing in steps of 1/8192 of the sample rate, added to the noise level of each line
+	AthBaseCurve = [
+		0x78, 0x5F, 0x56, 0x51, 0x4E, 0x4C, 0x4B, 0x49, 0x48, 0x48, 0x47, 0x46, 0x46, 0x45, 0x45, 0x45,
+		0x44, 0x44, 0x44, 0x44, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42,
+		0x42, 0x42, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x40, 0x40, 0x40, 0x40,
+		0x40, 0x40, 0x40, 0x40, 0x40, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F,
+		0x3F, 0x3F, 0x3F, 0x3E, 0x3E, 0x3E, 0x3E, 0x3E, 0x3E, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D,
+		0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B,
+		0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B,
+		0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3B, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C, 0x3C,
+		0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3D, 0x3E, 0x3E, 0x3E, 0x3E, 0x3E, 0x3E, 0x3E, 0x3F,
+		0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F, 0x3F,
+		0x3F, 0x3F, 0x3F, 0x3F, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40,
+		0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x40, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41,
+		0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41,
+		0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x41, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42,
+		0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x42, 0x43, 0x43, 0x43,
+		0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x43, 0x44, 0x44,
+		0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x44, 0x45, 0x45, 0x45, 0x45,
+		0x45, 0x45, 0x45, 0x45, 0x45, 0x45, 0x45, 0x45, 0x46, 0x46, 0x46, 0x46, 0x46, 0x46, 0x46, 0x46,
+		0x46, 0x46, 0x47, 0x47, 0x47, 0x47, 0x47, 0x47, 0x47, 0x47, 0x47, 0x47, 0x48, 0x48, 0x48, 0x48,
+		0x48, 0x48, 0x48, 0x48, 0x49, 0x49, 0x49, 0x49, 0x49, 0x49, 0x49, 0x49, 0x4A, 0x4A, 0x4A, 0x4A,
+		0x4A, 0x4A, 0x4A, 0x4A, 0x4B, 0x4B, 0x4B, 0x4B, 0x4B, 0x4B, 0x4B, 0x4C, 0x4C, 0x4C, 0x4C, 0x4C,
+		0x4C, 0x4D, 0x4D, 0x4D, 0x4D, 0x4D, 0x4D, 0x4E, 0x4E, 0x4E, 0x4E, 0x4E, 0x4E, 0x4F, 0x4F, 0x4F,
+		0x4F, 0x4F, 0x4F, 0x50, 0x50, 0x50, 0x50, 0x50, 0x51, 0x51, 0x51, 0x51, 0x51, 0x52, 0x52, 0x52,
+		0x52, 0x52, 0x53, 0x53, 0x53, 0x53, 0x54, 0x54, 0x54, 0x54, 0x54, 0x55, 0x55, 0x55, 0x55, 0x56,
+		0x56, 0x56, 0x56, 0x57, 0x57, 0x57, 0x57, 0x57, 0x58, 0x58, 0x58, 0x59, 0x59, 0x59, 0x59, 0x5A,
+		0x5A, 0x5A, 0x5A, 0x5B, 0x5B, 0x5B, 0x5B, 0x5C, 0x5C, 0x5C, 0x5D, 0x5D, 0x5D, 0x5D, 0x5E, 0x5E,
+		0x5E, 0x5F, 0x5F, 0x5F, 0x60, 0x60, 0x60, 0x61, 0x61, 0x61, 0x61, 0x62, 0x62, 0x62, 0x63, 0x63,
+		0x63, 0x64, 0x64, 0x64, 0x65, 0x65, 0x66, 0x66, 0x66, 0x67, 0x67, 0x67, 0x68, 0x68, 0x68, 0x69,
+		0x69, 0x6A, 0x6A, 0x6A, 0x6B, 0x6B, 0x6B, 0x6C, 0x6C, 0x6D, 0x6D, 0x6D, 0x6E, 0x6E, 0x6F, 0x6F,
+		0x70, 0x70, 0x70, 0x71, 0x71, 0x72, 0x72, 0x73, 0x73, 0x73, 0x74, 0x74, 0x75, 0x75, 0x76, 0x76,
+		0x77, 0x77, 0x78, 0x78, 0x78, 0x79, 0x79, 0x7A, 0x7A, 0x7B, 0x7B, 0x7C, 0x7C, 0x7D, 0x7D, 0x7E,
+		0x7E, 0x7F, 0x7F, 0x80, 0x80, 0x81, 0x81, 0x82, 0x83, 0x83, 0x84, 0x84, 0x85, 0x85, 0x86, 0x86,
+		0x87, 0x88, 0x88, 0x89, 0x89, 0x8A, 0x8A, 0x8B, 0x8C, 0x8C, 0x8D, 0x8D, 0x8E, 0x8F, 0x8F, 0x90,
+		0x90, 0x91, 0x92, 0x92, 0x93, 0x94, 0x94, 0x95, 0x95, 0x96, 0x97, 0x97, 0x98, 0x99, 0x99, 0x9A,
+		0x9B, 0x9B, 0x9C, 0x9D, 0x9D, 0x9E, 0x9F, 0xA0, 0xA0, 0xA1, 0xA2, 0xA2, 0xA3, 0xA4, 0xA5, 0xA5,
+		0xA6, 0xA7, 0xA7, 0xA8, 0xA9, 0xAA, 0xAA, 0xAB, 0xAC, 0xAD, 0xAE, 0xAE, 0xAF, 0xB0, 0xB1, 0xB1,
+		0xB2, 0xB3, 0xB4, 0xB5, 0xB6, 0xB6, 0xB7, 0xB8, 0xB9, 0xBA, 0xBA, 0xBB, 0xBC, 0xBD, 0xBE, 0xBF,
+		0xC0, 0xC1, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7, 0xC8, 0xC9, 0xC9, 0xCA, 0xCB, 0xCC, 0xCD,
+		0xCE, 0xCF, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9, 0xDA, 0xDB, 0xDC, 0xDD,
+		0xDE, 0xDF, 0xE0, 0xE1, 0xE2, 0xE3, 0xE4, 0xE5, 0xE6, 0xE7, 0xE8, 0xE9, 0xEA, 0xEB, 0xED, 0xEE,
+		0xEF, 0xF0, 0xF1, 0xF2, 0xF3, 0xF4, 0xF5, 0xF7, 0xF8, 0xF9, 0xFA, 0xFB, 0xFC, 0xFD, 0xFF, 0xFF,
+	]
+
+	def __init__(self, header):
+		fmt = header.FmtChunk
+		comp = header.CompChunk if header.CompChunk is not None else header.DecChunk
+		assert comp is not None
+		if numpy is None:
+			raise ImportError("Decoding HCA requires NumPy.")
+
+		self.Version = header.Version
+		self.ChannelCount = fmt.ChannelCount
+		self.MinResolution = comp.MinResolution
+		self.MaxResolution = comp.MaxResolution
+		self.TotalBandCount = comp.TotalBandCount
+		self.BaseBandCount = comp.BaseBandCount
+		self.StereoBandCount = comp.StereoBandCount
+		self.BandsPerHfrGroup = comp.BandsPerHfrGroup if header.CompChunk is not None else 0
+		self.HfrGroupCount = 0
+		if self.BandsPerHfrGroup:
+			self.HfrGroupCount = math.ceil((self.TotalBandCount - self.BaseBandCount - self.StereoBandCount) / self.BandsPerHfrGroup)
+
+		athType = header.AthChunk.UseAthCurve if header.AthChunk is not None else (1 if self.Version < 0x200 else 0)
+		if athType not in (0, 1):
+			raise ValueError(f"Unknown HCA ATH curve type {athType}.")
+		self.AthCurve = [0]*self.SamplesPerSubframe
+		if athType == 1:
+			position = 0
+			for i in range(self.SamplesPerSubframe):
+				position += fmt.SampleRate
+				index = position >> 13
+				if index >= 654:
+					self.AthCurve[i:] = [0xFF]*(self.SamplesPerSubframe - i)
+					break
+				self.AthCurve[i] = self.AthBaseCurve[index]
+		self.Volume = header.RvaChunk.Volume if header.RvaChunk is not None else 1.0
+
+		self.ChannelTypes = self.GetChannelTypes(comp.TrackCount or 1, comp.ChannelConfig)
+		self.CodedCounts = [self.BaseBandCount + (0 if channelType == ChannelType.StereoSecondary else self.StereoBandCount) for channelType in self.ChannelTypes]
+		# an intensity of 15 doesn't get written, so the rest of the previous frame's stays in effect
+		self.Intensities = [[0]*self.SubframeCount for i in range(self.ChannelCount)]
+
+		highBands, lowBands, groups = list(), list(), list()
+		highBand = self.BaseBandCount + self.StereoBandCount
+		lowBand = highBand - 1
+		groupLimit = self.HfrGroupCount if self.Version <= 0x200 else self.HfrGroupCount >> 1
+		for group in range(self.HfrGroupCount):
+			for i in range(self.BandsPerHfrGroup):
+				if highBand >= self.TotalBandCount or lowBand < 0:
+					break
+				highBands.append(highBand)
+				lowBands.append(lowBand)
+				groups.append(group)
+				highBand += 1
+				lowBand -= 1 if group < groupLimit else 0
+		self.HfrHighBands = numpy.array(highBands, dtype=numpy.intp)
+		self.HfrLowBands = numpy.array(lowBands, dtype=numpy.intp)
+		self.HfrGroups = numpy.array(groups, dtype=numpy.intp)
+		self.HfrLastBand = highBand - 1
+
+		self.Previous = numpy.zeros((self.ChannelCount, self.SamplesPerSubframe))
+
+	def GetChannelTypes(self, trackCount, channelConfig):
+		types = [ChannelType.Discrete] * self.ChannelCount
+		channelsPerTrack = self.ChannelCount // trackCount
+		if self.StereoBandCount and channelsPerTrack > 1:
+			pair = [ChannelType.StereoPrimary, ChannelType.StereoSecondary]
+			discrete = [ChannelType.Discrete]*2
+			layouts = {
+				2: pair,
+				3: pair + discrete[:1],
+				4: pair + (pair if channelConfig == 0 else discrete),
+				5: pair + discrete[:1] + (pair if channelConfig <= 2 else discrete),
+				6: pair + discrete + pair,
+				7: pair + discrete + pair + discrete[:1],
+				8: pair + discrete + pair + pair,
+			}
+			layout = layouts.get(channelsPerTrack, [ChannelType.Discrete] * channelsPerTrack)
+			for track in range(trackCount):
+				types[track*channelsPerTrack:(track+1)*channelsPerTrack] = layout
+		return types
+
+	def DecodeFrames(self, frames):
+		frameCount = len(frames)
+		scaleFactors = numpy.zeros((frameCount, self.ChannelCount, self.SamplesPerSubframe), dtype=numpy.intp)
+		resolutions = numpy.zeros((frameCount, self.ChannelCount, self.SamplesPerSubframe), dtype=numpy.intp)
+		hfrScales = numpy.zeros((frameCount, self.ChannelCount, max(self.HfrGroupCount, 1)), dtype=numpy.intp)
+		intensities = numpy.zeros((frameCount, self.ChannelCount, self.SubframeCount), dtype=numpy.intp)
+		quantized = numpy.zeros((frameCount, self.ChannelCount, self.SubframeCount, self.SamplesPerSubframe))
+		for i, frame in enumerate(frames):
+			self.UnpackFrame(frame, scaleFactors[i], resolutions[i], hfrScales[i], intensities[i], quantized[i])
+
+		# everything from here on is per-coefficient arithmetic that doesn't depend on the bitstream
+		gains = DequantizerScaling[scaleFactors] * QuantizerStepSize[resolutions]
+		spectra = quantized * gains[:, :, None, :]
+
+		if len(self.HfrHighBands):
+			for ch, channelType in enumerate(self.ChannelTypes):
+				if channelType == ChannelType.StereoSecondary:
+					continue
+				channelSpectra = spectra[:, ch]
+				scaleInds = numpy.clip(hfrScales[:, ch][:, self.HfrGroups] - scaleFactors[:, ch][:, self.HfrLowBands] + 63, 0, 127)
+				channelSpectra[:, :, self.HfrHighBands] = ScaleConversion[scaleInds][:, None, :] * channelSpectra[:, :, self.HfrLowBands]
+				channelSpectra[:, :, self.HfrLastBand] = 0
+
+		for ch in range(self.ChannelCount - 1):
+			if self.ChannelTypes[ch] != ChannelType.StereoPrimary:
+				continue
+			ratios = IntensityRatios[intensities[:, ch+1]][:, :, None]
+			bands = slice(self.BaseBandCount, self.TotalBandCount)
+			spectra[:, ch+1, :, bands] = spectra[:, ch, :, bands] * (2.0 - ratios)
+			spectra[:, ch, :, bands] *= ratios
+
+		# IMDCT over every subframe at once, then overlap-add each one with the tail of the one before
+		blocks = spectra.transpose(1, 0, 2, 3).reshape(self.ChannelCount, frameCount*self.SubframeCount, self.SamplesPerSubframe)
+		windowed = (blocks @ ImdctBasis) * ImdctWindow
+		tails = numpy.concatenate((self.Previous[:, None, :], windowed[:, :-1, self.SamplesPerSubframe:]), axis=1)
+		self.Previous = windowed[:, -1, self.SamplesPerSubframe:]
+		samples = windowed[:, :, :self.SamplesPerSubframe] + tails
+
+		samples = samples.reshape(self.ChannelCount, frameCount, self.SamplesPerFrame).transpose(1, 2, 0)
+		pcmData = numpy.clip(numpy.rint(samples * (self.Volume * 32768)), -32768, 32767).astype(numpy.int16)
+		return list(pcmData)
+
+	def UnpackFrame(self, frame, scaleFactors, resolutions, hfrScales, intensities, quantized):
+		frame = bytes(frame)
+		# three bytes at every byte offset, so any read of up to 16 bits is a single shift and mask
+		words = [int.from_bytes(frame[i:i+3].ljust(3, b"\0"), "big") for i in range(len(frame))]
+		pos = 0
+
+		def Read(bits):
+			nonlocal pos
+			value = ((words[pos >> 3] >> (8 - (pos & 7))) & 0xFFFF) >> (16 - bits)
+			pos += bits
+			return value
+
+		def Peek(bits):
+			return ((words[pos >> 3] >> (8 - (pos & 7))) & 0xFFFF) >> (16 - bits)
+
+		if Read(16) != 0xFFFF:
+			raise ValueError("HCA frame is missing its sync word.")
+		noiseLevel = (Read(9) << 8) - Read(7)
+		athCurve = self.AthCurve
+
+		for ch, channelType in enumerate(self.ChannelTypes):
+			codedCount = self.CodedCounts[ch]
+			deltaBits = Read(3)
+			if deltaBits >= 6:
+				for i in range(codedCount):
+					scaleFactors[ch, i] = Read(6)
+			elif deltaBits > 0:
+				expectedDelta = (1 << deltaBits) - 1
+				value = Read(6)
+				scaleFactors[ch, 0] = value
+				for i in range(1, codedCount):
+					delta = Read(deltaBits)
+					if delta == expectedDelta:
+						value = Read(6)
+					else:
+						value = value - (expectedDelta >> 1) + delta
+						if not 0 <= value < 64:
+							raise ValueError("HCA frame has invalid scale factors; is it still encrypted?")
+					scaleFactors[ch, i] = value
+
+			if channelType == ChannelType.StereoSecondary:
+				channelIntensities = self.Intensities[ch]
+				value = Peek(4)
+				if self.Version <= 0x200:
+					channelIntensities[0] = value
+					if value < 15:
+						pos += 4
+						for i in range(1, self.SubframeCount):
+							channelIntensities[i] = Read(4)
+				else:
+					pos += 4
+					if value < 15:
+						deltaBits = Read(2)
+						channelIntensities[0] = value
+						if deltaBits == 3:
+							for i in range(1, self.SubframeCount):
+								channelIntensities[i] = Read(4)
+						else:
+							maxDelta = (2 << deltaBits) - 1
+							for i in range(1, self.SubframeCount):
+								delta = Read(deltaBits + 1)
+								if delta == maxDelta:
+									value = Read(4)
+								else:
+									value = value - (maxDelta >> 1) + delta
+									if not 0 <= value < 16:
+										raise ValueError("HCA frame has invalid intensities; is it still encrypted?")
+								channelIntensities[i] = value
+					else:
+						channelIntensities[:] = [7]*self.SubframeCount
+				intensities[ch] = channelIntensities
+			else:
+				for i in range(self.HfrGroupCount):
+					hfrScales[ch, i] = Read(6)
+
+			for i in range(codedCount):
+				resolution = 0
+				scaleFactor = int(scaleFactors[ch, i])
+				if scaleFactor:
+					curvePosition = athCurve[i] + ((noiseLevel + i) >> 8) + 1 - ((5 * scaleFactor) >> 1)
+					if curvePosition < 0:
+						resolution = 15
+					elif curvePosition < len(self.InvertTable):
+						resolution = self.InvertTable[curvePosition]
+					resolution = max(self.MinResolution, min(self.MaxResolution, resolution))
+				resolutions[ch, i] = resolution
+
+		channelResolutions = [resolutions[ch, :self.CodedCounts[ch]].tolist() for ch in range(self.ChannelCount)]
+		maxBits, prefixBits, prefixValues = self.MaxBits, self.PrefixBits, self.PrefixValues
+		for subframe in range(self.SubframeCount):
+			for ch in range(self.ChannelCount):
+				values = [0]*len(channelResolutions[ch])
+				for i, resolution in enumerate(channelResolutions[ch]):
+					if not resolution:
+						continue
+					bits = maxBits[resolution]
+					code = ((words[pos >> 3] >> (8 - (pos & 7))) & 0xFFFF) >> (16 - bits)
+					if resolution > 7:
+						# sign-magnitude, with the sign in the low bit; zero has no sign bit
+						magnitude = code >> 1
+						if magnitude:
+							values[i] = -magnitude if code & 1 else magnitude
+							pos += bits
+						else:
+							pos += bits - 1
+					else:
+						index = (resolution << 4) + code
+						values[i] = prefixValues[index]
+						pos += prefixBits[index]
+				quantized[ch, subframe, :len(values)] = values
+
+		if pos > (len(frame) - 2) * 8:
+			raise ValueError("HCA frame overruns its checksum; is it still encrypted?")
+		return pos
+
+
+class HCAEncoder:
+
+	# leading silence, so the first subframe's aliasing has nothing to cancel out
+	InsertedSamples = 128
+	MinResolution = 1
+	MaxResolution = 15
+
+	def __init__(self, channelCount, sampleRate, bitrate=None):
+		if numpy is None:
+			raise ImportError("Encoding HCA requires NumPy.")
+		if bitrate is None:
+			bitrate = 128000 * channelCount
+		self.ChannelCount = channelCount
+		self.SampleRate = sampleRate
+		self.FrameSize = min(0xFFFF, math.ceil(bitrate * HCADecoder.SamplesPerFrame / sampleRate / 8))
+		self.FrameBits = (self.FrameSize - 2) * 8
+		# at the coarsest noise level a band costs at most a 6-bit scale factor and 2 bits in each subframe,
+		# so coding only as many bands as fit that way guarantees every frame can be made to fit
+		self.BandCount = min(128, ((self.FrameBits - 32) // channelCount - 3) // (6 + 2*HCADecoder.SubframeCount))
+		if self.BandCount < 1:
+			raise ValueError(f"{bitrate} bps is too low to encode {channelCount} channels at {sampleRate} Hz.")
+
+	def CreateHeader(self, frameCount, sampleCount, loopStart=None, loopEnd=None):
+		header = HCAHeader()
+		header.Magic = b"HCA\0"
+		header.Version = 0x200
+		header.HeaderSize = 0
+
+		header.FmtChunk = FmtChunk()
+		header.FmtChunk.Magic = b"fmt\0"
+		header.FmtChunk.ChannelCount = self.ChannelCount
+		header.FmtChunk.SampleRate = self.SampleRate
+		header.FmtChunk.FrameCount = frameCount
+		header.FmtChunk.InsertedSamples = self.InsertedSamples
+		header.FmtChunk.AppendedSamples = frameCount*HCADecoder.SamplesPerFrame - self.InsertedSamples - sampleCount
+		header.FmtChunk.SampleCount = sampleCount
+
+		header.CompChunk = CompChunk()
+		header.CompChunk.Magic = b"comp"
+		header.CompChunk.FrameSize = self.FrameSize
+		header.CompChunk.MinResolution = self.MinResolution
+		header.CompChunk.MaxResolution = self.MaxResolution
+		header.CompChunk.TrackCount = 1
+		header.CompChunk.ChannelConfig = 0
+		header.CompChunk.TotalBandCount = self.BandCount
+		header.CompChunk.BaseBandCount = self.BandCount
+		header.CompChunk.StereoBandCount = 0
+		header.CompChunk.BandsPerHfrGroup = 0
+		header.CompChunk.RESERVED = 0
+
+		if loopStart is not None:
+			loopStart += self.InsertedSamples
+			loopEnd += self.InsertedSamples
+			header.LoopChunk = LoopChunk()
+			header.LoopChunk.Magic = b"loop"
+			header.LoopChunk.LoopStartFrame = loopStart // HCADecoder.SamplesPerFrame
+			header.LoopChunk.LoopEndFrame = (loopEnd - 1) // HCADecoder.SamplesPerFrame
+			header.LoopChunk.PreLoopSamples = loopStart % HCADecoder.SamplesPerFrame
+			header.LoopChunk.PostLoopSamples = (header.LoopChunk.LoopEndFrame + 1)*HCADecoder.SamplesPerFrame - loopEnd
+
+		# left unencrypted, but present so the stream can be encrypted later
+		header.CiphChunk = CiphChunk()
+		header.CiphChunk.Magic = b"ciph"
+		header.CiphChunk.EncryptionType = 0
+
+		header.HeaderSize = header.calcsize() + 2
+		return header
+
+	def EncodeFrames(self, samples, jobs=1, batchSize=256):
+		# frames only depend on their own stretch of samples, so batches of them can go to separate processes
+		frameCount = (samples.shape[1] - HCADecoder.SamplesPerSubframe) // HCADecoder.SamplesPerFrame
+		batches = list()
+		for start in range(0, frameCount, batchSize):
+			end = min(start + batchSize, frameCount)
+			batches.append(samples[:, start*HCADecoder.SamplesPerFrame:end*HCADecoder.SamplesPerFrame + HCADecoder.SamplesPerSubframe])
+		if jobs is None or jobs <= 1 or len(batches) <= 1:
+			return b"".join(self.EncodeBatch(batch) for batch in batches)
+		with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+			return b"".join(executor.map(self.EncodeBatch, batches))
+
+	def EncodeBatch(self, samples):
+		frameCount = (samples.shape[1] - HCADecoder.SamplesPerSubframe) // HCADecoder.SamplesPerFrame
+		windows = numpy.lib.stride_tricks.sliding_window_view(samples, 2*HCADecoder.SamplesPerSubframe, axis=1)[:, ::HCADecoder.SamplesPerSubframe]
+		windows = windows[:, :frameCount*HCADecoder.SubframeCount]
+		# the forward transform that the decoder's windowed IMDCT and overlap-add exactly undo
+		spectra = (windows * ImdctWindow) @ ImdctBasis.T
+		spectra = spectra.reshape(self.ChannelCount, frameCount, HCADecoder.SubframeCount, HCADecoder.SamplesPerSubframe)
+		spectra = spectra.transpose(1, 0, 2, 3)[..., :self.BandCount]
+
+		# smallest scale that covers each band's peak across the frame's subframes
+		peaks = numpy.abs(spectra).max(axis=2)
+		scaleFactors = numpy.clip(numpy.searchsorted(DequantizerScaling, peaks), 0, 63)
+		scaleValues, scaleLengths = self.ScaleFactorFields(scaleFactors)
+		headerBits = 32 + scaleLengths.sum(axis=(1, 2))
+
+		# binary search every frame's noise level at once for the finest that still fits; levels are indexed
+		# in increasing order, with the 9-bit level in the high bits and the 7-bit boundary reversed in the low
+		low = numpy.zeros(frameCount, dtype=numpy.int64)
+		high = numpy.full(frameCount, 0xFFFF, dtype=numpy.int64)
+		while (low < high).any():
+			middle = (low + high) >> 1
+			bits = headerBits + self.CoefficientFields(spectra, scaleFactors, middle)[1].sum(axis=(1, 2, 3))
+			fits = bits <= self.FrameBits
+			high = numpy.where(fits, middle, high)
+			low = numpy.where(fits, low, middle + 1)
+		codes, lengths = self.CoefficientFields(spectra, scaleFactors, low)
+		overflow = headerBits + lengths.sum(axis=(1, 2, 3)) > self.FrameBits
+		if overflow.any():
+			low[overflow] = 0xFFFF
+			codes, lengths = self.CoefficientFields(spectra, scaleFactors, low)
+
+		headerValues = numpy.stack((numpy.full(frameCount, 0xFFFF), low >> 7, 127 - (low & 127)), axis=1)
+		values = numpy.concatenate((headerValues, scaleValues.reshape(frameCount, -1), codes.reshape(frameCount, -1)), axis=1)
+		lengths = numpy.concatenate((numpy.tile([16, 9, 7], (frameCount, 1)), scaleLengths.reshape(frameCount, -1), lengths.reshape(frameCount, -1)), axis=1)
+		frames = PackBitFields(values, lengths, self.FrameSize)
+
+		crcs = numpy.array(HcaCrc.ComputeFrames(frames, self.FrameSize, frameCount, self.FrameSize-2), dtype=numpy.uint16)
+		frames[:, -2] = crcs >> 8
+		frames[:, -1] = crcs & 0xFF
+		return frames.tobytes()
+
+	def ScaleFactorFields(self, scaleFactors):
+		# picks the cheapest delta width per channel; 0 means every scale factor is 0 and 6 means no deltas
+		deltas = numpy.diff(scaleFactors, axis=2)
+		costs = list()
+		for deltaBits in range(1, 6):
+			expectedDelta = (1 << deltaBits) - 1
+			inRange = (deltas >= -(expectedDelta >> 1)) & (deltas < expectedDelta - (expectedDelta >> 1))
+			costs.append(6 + numpy.where(inRange, deltaBits, deltaBits + 6).sum(axis=2))
+		costs.append(numpy.full(scaleFactors.shape[:2], 6*self.BandCount))
+		deltaBits = (numpy.argmin(numpy.stack(costs), axis=0) + 1)[..., None]
+		deltaBits[(scaleFactors == 0).all(axis=2)] = 0
+
+		expectedDelta = (1 << deltaBits) - 1
+		inRange = (deltas >= -(expectedDelta >> 1)) & (deltas < expectedDelta - (expectedDelta >> 1)) & (deltaBits < 6)
+		deltaValues = numpy.where(inRange, deltas + (expectedDelta >> 1), numpy.where(deltaBits < 6, expectedDelta, scaleFactors[..., 1:]))
+		deltaLengths = numpy.where(deltaBits < 6, deltaBits, 6) * (deltaBits > 0)
+		escapeLengths = numpy.where(inRange | (deltaBits >= 6) | (deltaBits == 0), 0, 6)
+
+		# laid out as the delta width, the first scale factor, then a delta and an optional escaped value per band
+		values = numpy.concatenate((deltaBits, scaleFactors[..., :1], numpy.stack((deltaValues, scaleFactors[..., 1:]), axis=3).reshape(*deltas.shape[:2], -1)), axis=2)
+		lengths = numpy.concatenate((numpy.full_like(deltaBits, 3), 6 * (deltaBits > 0), numpy.stack((numpy.broadcast_to(deltaLengths, deltas.shape), escapeLengths), axis=3).reshape(*deltas.shape[:2], -1)), axis=2)
+		return values, lengths
+
+	def CoefficientFields(self, spectra, scaleFactors, noiseIndices):
+		noiseLevels = ((noiseIndices >> 7) << 8) - (127 - (noiseIndices & 127))
+		curvePositions = ((noiseLevels[:, None, None] + numpy.arange(self.BandCount)) >> 8) + 1 - ((5 * scaleFactors) >> 1)
+		resolutions = numpy.where(curvePositions < 0, 15, EncoderInvertTable[numpy.clip(curvePositions, 0, len(EncoderInvertTable) - 1)])
+		resolutions = numpy.where(scaleFactors > 0, numpy.clip(resolutions, self.MinResolution, self.MaxResolution), 0)
+
+		gains = DequantizerScaling[scaleFactors] * QuantizerStepSize[resolutions]
+		inverseGains = numpy.divide(1.0, gains, out=numpy.zeros_like(gains), where=gains > 0)
+		limits = MaxQuantized[resolutions][:, :, None, :]
+		quantized = numpy.clip(numpy.rint(spectra * inverseGains[:, :, None, :]), -limits, limits).astype(numpy.int64)
+		# the decoder reads every channel's coefficients for a subframe before moving on to the next
+		quantized = quantized.transpose(0, 2, 1, 3) + 2047
+		resolutions = numpy.broadcast_to(resolutions[:, None, :, :], quantized.shape)
+		return CoefficientCodes[resolutions, quantized], CoefficientLengths[resolutions, quantized]
+
+
+def PackBitFields(values, lengths, frameSize):
+	# each row of (value, bit length) fields is written MSB-first from the start of its own frame
+	frameCount = values.shape[0]
+	starts = (numpy.cumsum(lengths, axis=1) - lengths + numpy.arange(frameCount)[:, None]*frameSize*8).ravel()
+	values = values.ravel()
+	lengths = lengths.ravel()
+	# one entry per bit actually written, naming the field it comes from
+	fields = numpy.repeat(numpy.arange(lengths.size), lengths)
+	offsets = numpy.arange(fields.size) - numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+	frameBits = numpy.zeros(frameCount*frameSize*8, dtype=numpy.uint8)
+	frameBits[starts[fields] + offsets] = (values[fields] >> (lengths[fields] - 1 - offsets)) & 1
+	return numpy.packbits(frameBits).reshape(frameCount, frameSize)
+
+
+if numpy is not None:
+	# sqrt(128) * 2^(53/128)^(scaleFactor - 63)
+	DequantizerScaling = (math.sqrt(128) * 2.0 ** ((numpy.arange(64) - 63) * 53 / 128)).astype(numpy.float32).astype(numpy.float64)
+	QuantizerStepSize = numpy.array([0.0] + [2 / (2*r + 1) for r in range(1, 8)] + [2 / ((1 << (r - 3)) - 1) for r in range(8, 16)], dtype=numpy.float32).astype(numpy.float64)
+	ScaleConversion = numpy.concatenate(([0.0], 2.0 ** ((numpy.arange(1, 128) - 63) * 53 / 128))).astype(numpy.float32).astype(numpy.float64)
+	IntensityRatios = numpy.array([(14 - i) / 7 for i in range(15)] + [0.0])
+	# rising half of the window as float32 bits; the falling half over the other 128 samples is its mirror
+	_rising = numpy.array([
+		0x3A3504F0, 0x3B0183B8, 0x3B70C538, 0x3BBB9268, 0x3C04A809, 0x3C308200, 0x3C61284C, 0x3C8B3F17,
+		0x3CA83992, 0x3CC77FBD, 0x3CE91110, 0x3D0677CD, 0x3D198FC4, 0x3D2DD35C, 0x3D434643, 0x3D59ECC1,
+		0x3D71CBA8, 0x3D85741E, 0x3D92A413, 0x3DA078B4, 0x3DAEF522, 0x3DBE1C9E, 0x3DCDF27B, 0x3DDE7A1D,
+		0x3DEFB6ED, 0x3E00D62B, 0x3E0A2EDA, 0x3E13E72A, 0x3E1E00B1, 0x3E287CF2, 0x3E335D55, 0x3E3EA321,
+		0x3E4A4F75, 0x3E56633F, 0x3E62DF37, 0x3E6FC3D1, 0x3E7D1138, 0x3E8563A2, 0x3E8C72B7, 0x3E93B561,
+		0x3E9B2AEF, 0x3EA2D26F, 0x3EAAAAAB, 0x3EB2B222, 0x3EBAE706, 0x3EC34737, 0x3ECBD03D, 0x3ED47F46,
+		0x3EDD5128, 0x3EE6425C, 0x3EEF4EFF, 0x3EF872D7, 0x3F00D4A9, 0x3F0576CA, 0x3F0A1D3B, 0x3F0EC548,
+		0x3F136C25, 0x3F180EF2, 0x3F1CAAC2, 0x3F213CA2, 0x3F25C1A5, 0x3F2A36E7, 0x3F2E9998, 0x3F32E705,
+		0x3F371C9E, 0x3F3B37FE, 0x3F3F36F2, 0x3F431780, 0x3F46D7E6, 0x3F4A76A4, 0x3F4DF27C, 0x3F514A6F,
+		0x3F547DC5, 0x3F578C03, 0x3F5A74EE, 0x3F5D3887, 0x3F5FD707, 0x3F6250DA, 0x3F64A699, 0x3F66D908,
+		0x3F68E90E, 0x3F6AD7B1, 0x3F6CA611, 0x3F6E5562, 0x3F6FE6E7, 0x3F715BEF, 0x3F72B5D1, 0x3F73F5E6,
+		0x3F751D89, 0x3F762E13, 0x3F7728D7, 0x3F780F20, 0x3F78E234, 0x3F79A34C, 0x3F7A5397, 0x3F7AF439,
+		0x3F7B8648, 0x3F7C0ACE, 0x3F7C82C8, 0x3F7CEF26, 0x3F7D50CB, 0x3F7DA88E, 0x3F7DF737, 0x3F7E3D86,
+		0x3F7E7C2A, 0x3F7EB3CC, 0x3F7EE507, 0x3F7F106C, 0x3F7F3683, 0x3F7F57CA, 0x3F7F74B6, 0x3F7F8DB6,
+		0x3F7FA32E, 0x3F7FB57B, 0x3F7FC4F6, 0x3F7FD1ED, 0x3F7FDCAD, 0x3F7FE579, 0x3F7FEC90, 0x3F7FF22E,
+		0x3F7FF688, 0x3F7FF9D0, 0x3F7FFC32, 0x3F7FFDDA, 0x3F7FFEED, 0x3F7FFF8F, 0x3F7FFFDF, 0x3F7FFFFC,
+	], dtype=numpy.uint32).view(numpy.float32).astype(numpy.float64)
+	ImdctWindow = numpy.concatenate((_rising, _rising[::-1]))
+	_n = numpy.arange(256)
+	_k = numpy.arange(128)
+	ImdctBasis = math.sqrt(2 / 128) * numpy.cos(numpy.pi / 128 * (_n[None, :] + 0.5 + 64) * (_k[:, None] + 0.5))
+	del _rising, _n, _k
+
+	EncoderInvertTable = numpy.array(HCADecoder.InvertTable + [0])
+	MaxQuantized = numpy.array(list(range(8)) + [(1 << (HCADecoder.MaxBits[r] - 1)) - 1 for r in range(8, 16)])
+	# code and bit length for every resolution and quantized value (offset by 2047)
+	CoefficientCodes = numpy.zeros((16, 4095), dtype=numpy.int64)
+	CoefficientLengths = numpy.zeros((16, 4095), dtype=numpy.int64)
+	for _resolution in range(1, 16):
+		_maxBits = HCADecoder.MaxBits[_resolution]
+		if _resolution > 7:
+			_values = numpy.arange(-MaxQuantized[_resolution], MaxQuantized[_resolution] + 1)
+			CoefficientCodes[_resolution, _values + 2047] = (numpy.abs(_values) << 1) | (_values < 0)
+			CoefficientLengths[_resolution, _values + 2047] = numpy.where(_values == 0, _maxBits - 1, _maxBits)
+		else:
+			for _code in reversed(range(1 << _maxBits)):
+				_bits = HCADecoder.PrefixBits[(_resolution << 4) + _code]
+				if _bits:
+					_value = HCADecoder.PrefixValues[(_resolution << 4) + _code] + 2047
+					CoefficientCodes[_resolution, _value] = _code >> (_maxBits - _bits)
+					CoefficientLengths[_resolution, _value] = _bits
+	del _resolution, _maxBits, _values, _code, _bits, _value
@@ -1,16 +1,22 @@
+import array
+import functools
 import os
+import struct
+import sys
 
 import xml.etree.ElementTree as ET
 
 from enum import Enum
 
+from exbip import MappedReader, Writer
 from exbip.Serializable import Serializable
 from exbip.BinaryTargets.Interface.Base import EndiannessManager
+from exbip.Utilities.Deferred import DeferredBytes, load_deferred
 
 
 class UTF(Serializable):
 
-	def __init__(self, encodingType=None, tableName=None, columnCount=None, fields=None):
+	def __init__(self, encodingType=None, tableName=None, columnCount=None, fields=None, columnar=False, lazy=False):
 		self.Magic = "@UTF"
 		self.TableSize = 0
 		self.I_00 = 0
@@ -31,6 +37,25 @@ class UTF(Serializable):
 
 		self.Rows = list()
 
+		# if columnar, rows are kept as one array (or list) per field instead of in Rows,
+		# with row strings stored as offsets into StringPool
+		self.Columnar = columnar
+		if self.Fields is None:
+			self.Columns = list()
+		else:
+			self.Columns = [self.MakeColumn(i) for i in range(len(self.Fields))]
+		self.StringPool = StringPool(encodingType)
+
+		# if lazy, reading stops after the header, fields and their strings,
+		# and rows and nested payloads are read on first access
+		self.Lazy = lazy
+		self.Loaded = True
+
+		# tables that were read and haven't been modified since are written back out
+		# by copying the bytes they were read from
+		self.Source = None
+		self.Dirty = True
+
 	def to_xml(self, parent=None):
 
 		if parent is None:
@@ -105,13 +130,20 @@ class UTF(Serializable):
 		return root
 
 	def update_offsets(self):
-		self.tobytes()
+		self.calcsize()
 
 	def write_right(self, path):
 		self.update_offsets()
 		self.write(path)
 
-	def __rw_hook__(self, rw):
+	def __rw_hook__(self, rw, loadRows=False):
+
+		if rw.is_parselike and not self.IsDirty():
+			rw.rw_deferred_bytestring(self.Source, len(self.Source))
+			return
+
+		if rw.is_constructlike:
+			start = rw.global_tell()
 
 		with EndiannessManager(rw, ">"):
 
@@ -134,11 +166,15 @@ class UTF(Serializable):
 				self.ColumnCount = len(self.Fields)
 			self.ColumnCount = rw.rw_uint16(self.ColumnCount)
 			self.RowLength = rw.rw_uint16(self.RowLength)
-			if rw.is_parselike:
+			if rw.is_parselike and not self.Columnar:
 				self.RowCount = len(self.Rows)
 			self.RowCount = rw.rw_uint32(self.RowCount)
 
 			self.Fields = rw.rw_objs(self.Fields, Field, self.ColumnCount, self.EncodingType)
+			if rw.is_constructlike and self.Columnar:
+				self.Columns = [self.MakeColumn(i) for i in range(self.ColumnCount)]
+			if rw.is_constructlike:
+				self.Loaded = loadRows or not self.Lazy
 
 			##########
 			## ROWS ##
@@ -147,18 +183,10 @@ class UTF(Serializable):
 			if rw.is_parselike:
 				self.RowOffset = rw.tell() - 8
 			assert rw.tell() == self.RowOffset+8
-			for i in range(self.RowCount):
-				rowstart = rw.tell()
-				if rw.is_constructlike: # reader
-					self.Rows.append(list())
-				for j in range(self.ColumnCount):
-					if rw.is_constructlike: # reader
-						self.Rows[i].append(None)
-					if self.Fields[j].RowStorageFlag:
-						self.Rows[i][j] = rw.rw_obj(self.Rows[i][j], CriValue, self.Fields[j].TypeFlag, self.EncodingType)
-				if i == 0 and rw.is_parselike:
-			 		self.RowLength = rw.tell() - rowstart
-				#assert rw.tell() - rowstart == self.RowLength
+			if self.Loaded:
+				self.RwRows(rw)
+			else:
+				rw.seek(self.StringsOffset+8)
 
 			#############
 			## STRINGS ##
@@ -168,32 +196,34 @@ class UTF(Serializable):
 				self.StringsOffset = rw.tell() - 8
 			assert rw.tell() == self.StringsOffset+8
 
-			if rw.is_parselike:
-				self.TableName.Offset = rw.tell() - (self.StringsOffset+8)
-			assert rw.tell() == self.StringsOffset+8 + self.TableName.Offset
-			self.TableName.RwValue(rw)
+			# the whole section is read in one go, and written in one go once identical strings have been merged
+			if rw.is_constructlike:
+				strings = StringPool(self.EncodingType, rw.rw_bytestring(None, self.DataOffset - self.StringsOffset))
+			else:
+				strings = StringPool(self.EncodingType)
+
+			self.TableName.RwValue(rw, strings)
 
 			for i in range(self.ColumnCount):
 				if self.Fields[i].NameFlag:
-					if rw.is_parselike:
-						self.Fields[i].Name.Offset = rw.tell() - (self.StringsOffset+8)
-					assert rw.tell() == self.StringsOffset+8 + self.Fields[i].Name.Offset
-					self.Fields[i].Name.RwValue(rw)
+					self.Fields[i].Name.RwValue(rw, strings)
 					self.FieldNames[self.Fields[i].Name.Value] = i
 				if self.Fields[i].DefaultValueFlag:
 					if TypeFlag(self.Fields[i].DefaultValue.TypeFlag) == TypeFlag.String:
-						if rw.is_parselike:
-							self.Fields[i].DefaultValue.Value.Offset = rw.tell() - (self.StringsOffset+8)
-						assert rw.tell() == self.StringsOffset+8 + self.Fields[i].DefaultValue.Value.Offset
-						self.Fields[i].DefaultValue.Value.RwValue(rw)
+						self.Fields[i].DefaultValue.Value.RwValue(rw, strings)
 
-			for i in range(self.RowCount):
-				for j in range(self.ColumnCount):
-					if self.Fields[j].RowStorageFlag and TypeFlag(self.Fields[j].TypeFlag) == TypeFlag.String:
-						if rw.is_parselike:
-							self.Rows[i][j].Value.Offset = rw.tell() - (self.StringsOffset+8)
-						assert rw.tell() == self.StringsOffset+8 + self.Rows[i][j].Value.Offset
-						self.Rows[i][j].Value.RwValue(rw)
+			if not self.Loaded:
+				pass
+			elif self.Columnar:
+				self.RwColumnarStrings(rw, strings)
+			else:
+				for i in range(self.RowCount):
+					for j in range(self.ColumnCount):
+						if self.Fields[j].RowStorageFlag and TypeFlag(self.Fields[j].TypeFlag) == TypeFlag.String:
+							self.Rows[i][j].Value.RwValue(rw, strings)
+
+			if rw.is_parselike:
+				rw.rw_bytestring(bytes(strings.Blob), len(strings.Blob))
 
 			##########
 			## DATA ##
@@ -216,28 +246,14 @@ class UTF(Serializable):
 					if rw.is_parselike:
 						self.Fields[i].DefaultValue.Value.Offset = rw.tell() - (self.DataOffset+8)
 					assert rw.tell() == self.DataOffset+8 + self.Fields[i].DefaultValue.Value.Offset
-					self.Fields[i].DefaultValue.Value.RwValue(rw)
+					self.Fields[i].DefaultValue.Value.RwValue(rw, self.Columnar, self.Lazy)
 					assert rw.tell() == self.DataOffset+8 + self.Fields[i].DefaultValue.Value.Offset + self.Fields[i].DefaultValue.Value.Length
 
 			# row storage values
-			for i in range(self.RowCount):
-				for j in range(self.ColumnCount):
-					if self.Fields[j].RowStorageFlag and TypeFlag(self.Fields[j].TypeFlag) == TypeFlag.Data and self.Rows[i][j].Value.Length:
-						if rw.is_parselike:
-							self.Rows[i][j].Value.Offset = rw.tell() - (self.DataOffset+8)
-						assert rw.tell() <= self.DataOffset+8 + self.Rows[i][j].Value.Offset
-						if rw.is_constructlike:
-							dataPadSize = self.DataOffset+8+self.Rows[i][j].Value.Offset - rw.tell()
-							dataPad = None
-							dataPad = rw.rw_bytestring(dataPad, dataPadSize)
-							assert all(c == 0 for c in dataPad)
-						elif rw.is_parselike:
-							self.Rows[i][j].Value.Offset = rw.tell() - (self.DataOffset+8)
-						assert rw.tell() == self.DataOffset+8 + self.Rows[i][j].Value.Offset
-						self.Rows[i][j].Value.RwValue(rw)
-						if rw.is_parselike:
-							self.Rows[i][j].Value.Length = rw.tell() - (self.DataOffset+8 + self.Rows[i][j].Value.Offset)
-						assert rw.tell() == self.DataOffset+8 + self.Rows[i][j].Value.Offset + self.Rows[i][j].Value.Length
+			if self.Loaded:
+				self.RwRowData(rw)
+			else:
+				rw.seek(self.TableSize+8)
 
 			endPadSize = 4 - ((rw.tell() % 4) or 4)
 			endPadding = None
@@ -252,15 +268,195 @@ class UTF(Serializable):
 			if rw.is_parselike:
 				self.TableSize = rw.tell() - 8
 
+		if rw.is_constructlike:
+			source = getattr(rw, "_source", None)
+			if source is not None:
+				self.Source = DeferredBytes(source, start, rw.global_tell()-start)
+			self.Dirty = False
+
+	def RwRowData(self, rw):
+		dataFields = [j for j in range(self.ColumnCount) if self.Fields[j].RowStorageFlag and TypeFlag(self.Fields[j].TypeFlag) == TypeFlag.Data]
+		for i in range(self.RowCount):
+			for j in dataFields:
+				if self.GetRowData(i, j).Length:
+					refData = self.GetRowData(i, j)
+					if rw.is_parselike:
+						refData.Offset = rw.tell() - (self.DataOffset+8)
+					assert rw.tell() <= self.DataOffset+8 + refData.Offset
+					if rw.is_constructlike:
+						dataPadSize = self.DataOffset+8+refData.Offset - rw.tell()
+						dataPad = None
+						dataPad = rw.rw_bytestring(dataPad, dataPadSize)
+						assert all(c == 0 for c in dataPad)
+					elif rw.is_parselike:
+						refData.Offset = rw.tell() - (self.DataOffset+8)
+					assert rw.tell() == self.DataOffset+8 + refData.Offset
+					refData.RwValue(rw, self.Columnar, self.Lazy)
+					if rw.is_parselike:
+						refData.Length = rw.tell() - (self.DataOffset+8 + refData.Offset)
+					assert rw.tell() == self.DataOffset+8 + refData.Offset + refData.Length
+
+	def Load(self):
+		if self.Loaded:
+			return
+		source = self.Source
+		reader = MappedReader()
+		with reader.BufferIO(source.load()):
+			reader.rw_obj(self, None, True)
+		self.Source = source
+
+	def MarkDirty(self):
+		self.Load()
+		self.Dirty = True
+
+	def IsDirty(self):
+		if not self.Loaded:
+			return False
+		if self.Dirty or self.Source is None:
+			return True
+		# a nested table can only be copied if everything under it can be too,
+		# and AWBs have no tracking of their own
+		for i in range(self.ColumnCount):
+			if TypeFlag(self.Fields[i].TypeFlag) != TypeFlag.Data:
+				continue
+			if self.Fields[i].DefaultValueFlag:
+				if IsDirtyData(self.Fields[i].DefaultValue.Value):
+					return True
+			if self.Fields[i].RowStorageFlag:
+				for j in range(self.RowCount):
+					if IsDirtyData(self.GetRowData(j, i)):
+						return True
+		return False
+
+	# every row has the same fixed-width layout, so the whole block goes through one precompiled struct
+	def RwRows(self, rw):
+		rowFields = [j for j in range(self.ColumnCount) if self.Fields[j].RowStorageFlag]
+		rowStruct = RowStruct(tuple(self.Fields[j].TypeFlag for j in rowFields))
+
+		if rw.is_constructlike: # reader
+			rowBytes = rw.rw_bytestring(None, rowStruct.size*self.RowCount)
+			if rowStruct.size:
+				rows = list(rowStruct.iter_unpack(rowBytes))
+			else:
+				rows = [()] * self.RowCount
+			if self.Columnar:
+				items = list(zip(*rows))
+				k = 0
+				for j in rowFields if rows else ():
+					typeFlag = TypeFlag(self.Fields[j].TypeFlag)
+					if typeFlag == TypeFlag.String:
+						self.Columns[j] = array.array("I", items[k])
+					elif typeFlag == TypeFlag.Data:
+						self.Columns[j] = [RefData(offset=offset, length=length) for offset, length in zip(items[k], items[k+1])]
+						k += 1
+					elif typeFlag == TypeFlag.GUID:
+						self.Columns[j] = [array.array("B", guid) for guid in items[k]]
+					else:
+						self.Columns[j] = array.array(ColumnTypes[typeFlag], items[k])
+					k += 1
+			else:
+				for row in rows:
+					cells = iter(row)
+					self.Rows.append([None] * self.ColumnCount)
+					for j in rowFields:
+						self.Rows[-1][j] = CriValue.FromRowItems(self.Fields[j].TypeFlag, self.EncodingType, cells)
+
+		elif rw.is_parselike: # writer
+			if self.Columnar:
+				items = list()
+				for j in rowFields:
+					typeFlag = TypeFlag(self.Fields[j].TypeFlag)
+					if typeFlag == TypeFlag.Data:
+						items.append([refData.Offset for refData in self.Columns[j]])
+						items.append([refData.Length for refData in self.Columns[j]])
+					elif typeFlag == TypeFlag.GUID:
+						items.append([bytes(guid) for guid in self.Columns[j]])
+					else:
+						items.append(self.Columns[j])
+				rows = zip(*items)
+			else:
+				rows = ([item for j in rowFields for item in self.Rows[i][j].ToRowItems()] for i in range(self.RowCount))
+			rowBytes = b"".join(rowStruct.pack(*row) for row in rows)
+			rw.rw_bytestring(rowBytes, len(rowBytes))
+			if self.RowCount:
+				self.RowLength = rowStruct.size
+
+	def RwColumnarStrings(self, rw, strings):
+		if rw.is_parselike:
+			for i in range(self.RowCount):
+				for j in range(self.ColumnCount):
+					if self.Fields[j].RowStorageFlag and TypeFlag(self.Fields[j].TypeFlag) == TypeFlag.String:
+						self.Columns[j][i] = strings.Add(self.StringPool.GetRaw(self.Columns[j][i]))
+		# either way the column offsets now point into the table's own strings section
+		self.StringPool = strings
+
+	def MakeColumn(self, fieldInd, values=()):
+		if not self.Fields[fieldInd].RowStorageFlag:
+			return None
+		typeFlag = TypeFlag(self.Fields[fieldInd].TypeFlag)
+		if typeFlag == TypeFlag.String:
+			return array.array("I", [self.AddString(value) for value in values])
+		if typeFlag in ColumnTypes:
+			return array.array(ColumnTypes[typeFlag], values)
+		return list(values)
+
+	def AddString(self, value):
+		if isinstance(value, RefString):
+			value = value.Value
+		return self.StringPool.Add(value.encode(StringEncoding(self.EncodingType)))
+
+	def GetColumnarValue(self, rowInd, fieldInd):
+		value = self.Columns[fieldInd][rowInd]
+		if TypeFlag(self.Fields[fieldInd].TypeFlag) == TypeFlag.String:
+			return RefString(encodingType=self.EncodingType, offset=value, value=self.StringPool.Get(value))
+		return value
+
+	def ToColumnarValue(self, fieldInd, value):
+		if TypeFlag(self.Fields[fieldInd].TypeFlag) == TypeFlag.String:
+			return self.AddString(value)
+		return value
+
+	def GetRowData(self, rowInd, fieldInd):
+		self.Load()
+		if self.Columnar:
+			return self.Columns[fieldInd][rowInd]
+		return self.Rows[rowInd][fieldInd].Value
+
+	# numeric columns come back as the stored array itself in columnar mode,
+	# which shouldn't be modified directly
+	def GetColumn(self, fieldName):
+		self.Load()
+		fieldInd = self.FieldNames[fieldName]
+		typeFlag = TypeFlag(self.Fields[fieldInd].TypeFlag)
+		if self.Fields[fieldInd].RowStorageFlag:
+			if self.Columnar:
+				if typeFlag == TypeFlag.String:
+					return [self.GetColumnarValue(i, fieldInd).Value for i in range(self.RowCount)]
+				return self.Columns[fieldInd]
+			values = [self.Rows[i][fieldInd].Value for i in range(self.RowCount)]
+		elif self.Fields[fieldInd].DefaultValueFlag:
+			values = [self.Fields[fieldInd].DefaultValue.Value] * self.RowCount
+		else:
+			return None
+		if typeFlag == TypeFlag.String:
+			return [value.Value for value in values]
+		if typeFlag in ColumnTypes:
+			return array.array(ColumnTypes[typeFlag], values)
+		return values
+
 	def GetRowField(self, rowInd, fieldName):
+		self.Load()
 		fieldInd = self.FieldNames[fieldName]
 		if self.Fields[fieldInd].RowStorageFlag:
+			if self.Columnar:
+				return CriValue(typeFlag=self.Fields[fieldInd].TypeFlag, value=self.GetColumnarValue(rowInd, fieldInd))
 			return self.Rows[rowInd][fieldInd]
 		if self.Fields[fieldInd].DefaultValueFlag:
 			return self.Fields[fieldInd].DefaultValue
 		return None
 
 	def TryConvertFieldToRowStorage(self, fieldInd, newValue):
+		self.Load()
 
 		if not self.Fields[fieldInd].DefaultValueFlag:
 			return
@@ -271,46 +467,67 @@ class UTF(Serializable):
 			return
 
 		assert not self.Fields[fieldInd].RowStorageFlag
+		self.Dirty = True
 		self.Fields[fieldInd].RowStorageFlag = 1
 		self.Fields[fieldInd].DefaultValueFlag = 0
-		for rowInd in range(self.RowCount):
-			self.Rows[rowInd][fieldInd] = CriValue(
-				typeFlag=self.Fields[fieldInd].TypeFlag,
-				value=self.Fields[fieldInd].DefaultValue.Value,
-			)
+		if self.Columnar:
+			self.Columns[fieldInd] = self.MakeColumn(fieldInd, [self.Fields[fieldInd].DefaultValue.Value] * self.RowCount)
+		else:
+			for rowInd in range(self.RowCount):
+				self.Rows[rowInd][fieldInd] = CriValue(
+					typeFlag=self.Fields[fieldInd].TypeFlag,
+					value=self.Fields[fieldInd].DefaultValue.Value,
+				)
 		self.Fields[fieldInd].DefaultValue = None
 
 	def SetRowField(self, rowInd, fieldName, newValue, overwriteDefaultValue=True):
+		self.Load()
 		fieldInd = self.FieldNames[fieldName]
 		if self.Fields[fieldInd].DefaultValueFlag:
 			self.TryConvertFieldToRowStorage(fieldInd, newValue)
 		if self.Fields[fieldInd].RowStorageFlag:
-			self.Rows[rowInd][fieldInd] = CriValue(
-				typeFlag=self.Fields[fieldInd].TypeFlag,
-				value=newValue,
-			)
+			if self.Columnar:
+				self.Columns[fieldInd][rowInd] = self.ToColumnarValue(fieldInd, newValue)
+			else:
+				self.Rows[rowInd][fieldInd] = CriValue(
+					typeFlag=self.Fields[fieldInd].TypeFlag,
+					value=newValue,
+				)
+			self.Dirty = True
 
 	def AddRow(self, rowFields):
+		self.Load()
 		row = list()
 		for i in range(self.ColumnCount):
 			if self.Fields[i].DefaultValueFlag:
 				self.TryConvertFieldToRowStorage(i, rowFields[self.Fields[i].Name.Value])
 			if self.Fields[i].RowStorageFlag:
-				row.append(CriValue(
-					typeFlag=self.Fields[i].TypeFlag,
-					value=rowFields[self.Fields[i].Name.Value],
-				))
+				if self.Columnar:
+					self.Columns[i].append(self.ToColumnarValue(i, rowFields[self.Fields[i].Name.Value]))
+				else:
+					row.append(CriValue(
+						typeFlag=self.Fields[i].TypeFlag,
+						value=rowFields[self.Fields[i].Name.Value],
+					))
 			else:
 				row.append(None)
-		self.Rows.append(row)
+		if not self.Columnar:
+			self.Rows.append(row)
 		self.RowCount += 1
+		self.Dirty = True
 
 	def SetRow(self, rowInd, rowFields):
+		self.Load()
 		for i in range(self.ColumnCount):
-			self.Rows[rowInd][i] = CriValue(
-				typeFlag=self.Fields[i].TypeFlag,
-				value=rowFields[self.Fields[i].Name.Value],
-			)
+			if self.Columnar:
+				if self.Fields[i].RowStorageFlag:
+					self.Columns[i][rowInd] = self.ToColumnarValue(i, rowFields[self.Fields[i].Name.Value])
+			else:
+				self.Rows[rowInd][i] = CriValue(
+					typeFlag=self.Fields[i].TypeFlag,
+					value=rowFields[self.Fields[i].Name.Value],
+				)
+		self.Dirty = True
 
 
 class Field(Serializable):
@@ -359,11 +576,35 @@ class RefString(Serializable):
 		self.EncodingType = encodingType
 		self.Offset = rw.rw_uint32(self.Offset)
 
-	def RwValue(self, rw):
-		if EncodingType(self.EncodingType) == EncodingType.Utf8:
-			self.Value = rw.rw_cstring(self.Value, encoding="utf-8")
-		elif EncodingType(self.EncodingType) == EncodingType.ShiftJis:
-			self.Value = rw.rw_cstring(self.Value, encoding="shift-jis")
+	def RwValue(self, rw, strings):
+		if rw.is_constructlike:
+			self.Value = strings.Get(self.Offset)
+		elif rw.is_parselike:
+			self.Offset = strings.Add(self.Value.encode(StringEncoding(self.EncodingType)))
+
+
+class StringPool:
+
+	# a UTF strings section, where identical strings are only stored once
+	def __init__(self, encodingType, blob=b""):
+		self.EncodingType = encodingType
+		self.Blob = bytearray(blob)
+		self.Offsets = dict()
+		self.Values = dict()
+
+	def Add(self, rawString):
+		if rawString not in self.Offsets:
+			self.Offsets[rawString] = len(self.Blob)
+			self.Blob += rawString + b"\x00"
+		return self.Offsets[rawString]
+
+	def GetRaw(self, offset):
+		return bytes(self.Blob[offset:self.Blob.index(b"\x00", offset)])
+
+	def Get(self, offset):
+		if offset not in self.Values:
+			self.Values[offset] = sys.intern(self.GetRaw(offset).decode(StringEncoding(self.EncodingType)))
+		return self.Values[offset]
 
 
 class CriValue(Serializable):
@@ -372,6 +613,28 @@ class CriValue(Serializable):
 		self.TypeFlag = typeFlag
 		self.Value = value
 
+	# rows are (de)serialized in bulk, so these convert to and from the items of a row struct
+	@staticmethod
+	def FromRowItems(typeFlag, encodingType, items):
+		if TypeFlag(typeFlag) == TypeFlag.String:
+			value = RefString(encodingType=encodingType, offset=next(items))
+		elif TypeFlag(typeFlag) == TypeFlag.Data:
+			value = RefData(offset=next(items), length=next(items))
+		elif TypeFlag(typeFlag) == TypeFlag.GUID:
+			value = array.array("B", next(items))
+		else:
+			value = next(items)
+		return CriValue(typeFlag=typeFlag, value=value)
+
+	def ToRowItems(self):
+		if TypeFlag(self.TypeFlag) == TypeFlag.String:
+			return (self.Value.Offset,)
+		elif TypeFlag(self.TypeFlag) == TypeFlag.Data:
+			return (self.Value.Offset, self.Value.Length)
+		elif TypeFlag(self.TypeFlag) == TypeFlag.GUID:
+			return (bytes(self.Value),)
+		return (self.Value,)
+
 	def __rw_hook__(self, rw, typeFlag, encodingType):
 		self.TypeFlag = typeFlag
 		if TypeFlag(typeFlag) == TypeFlag.UInt8:
@@ -408,24 +671,39 @@ class RefData(Serializable):
 		self.Offset = offset
 		self.Length = length
 		self.Magic = magic
+		# (reference to the payload bytes, columnar) while a lazily-read payload hasn't been parsed yet
+		self.Pending = None
 		self.Value = value
 
+	@property
+	def Value(self):
+		if self.Pending is not None:
+			self.LoadValue()
+		return self._Value
+
+	@Value.setter
+	def Value(self, value):
+		self.Pending = None
+		self._Value = value
+
 	def __rw_hook__(self, rw):
 		self.Offset = rw.rw_uint32(self.Offset)
 		self.Length = rw.rw_uint32(self.Length)
 
-	def RwValue(self, rw):
+	def RwValue(self, rw, columnar=False, lazy=False):
 		pos = rw.tell()
 		if self.Length:
 			if rw.is_constructlike: # reader
-				self.Magic = rw.peek_bytestream(4)
-			with rw.relative_origin():
-				if self.Magic == b"@UTF":
-					self.Value = rw.rw_obj(self.Value, UTF)
-				elif self.Magic == b"AFS2":
-					self.Value = rw.rw_obj(self.Value, AFS2)
-				else:
-					self.Value = rw.rw_uint8s(self.Value, self.Length)
+				self.Magic = bytes(rw.peek_bytestream(4))
+			if rw.is_constructlike and lazy:
+				self.Pending = (DeferredBytes(rw._source, rw.global_tell(), self.Length), columnar)
+				rw.seek(self.Length, os.SEEK_CUR)
+			elif rw.is_parselike and self.Pending is not None:
+				# never parsed, so it goes back out exactly as it came in
+				rw.rw_deferred_bytestring(self.Pending[0], self.Length)
+			else:
+				with rw.relative_origin():
+					self.RwPayload(rw, columnar, lazy)
 		if rw.is_constructlike:
 			assert rw.tell() <= pos + self.Length
 			padSize = pos + self.Length - rw.tell()
@@ -435,11 +713,33 @@ class RefData(Serializable):
 		elif rw.is_parselike:
 			self.Length = rw.tell() - pos
 		assert rw.tell() == pos + self.Length
+
+	def RwPayload(self, rw, columnar, lazy):
+		if self.Magic == b"@UTF":
+			if rw.is_constructlike:
+				self.Value = UTF(columnar=columnar, lazy=lazy)
+			self.Value = rw.rw_obj(self.Value)
+		elif self.Magic == b"AFS2":
+			if rw.is_constructlike:
+				self.Value = AFS2(lazy=lazy)
+			self.Value = rw.rw_obj(self.Value)
+		else:
+			self.Value = rw.rw_uint8s(self.Value, self.Length)
+
+	def LoadValue(self):
+		payload, columnar = self.Pending
+		self.Pending = None
+		reader = MappedReader()
+		with reader.BufferIO(payload.load()):
+			self.RwPayload(reader, columnar, True)
 	
 
 class AFS2(Serializable):
 
-	def __init__(self):
+	def __init__(self, lazy=False):
+		# if lazy, entry payloads aren't read until they're accessed through EntryData
+		self.Lazy = lazy
+
 		self.Magic = None
 
 		self.Type = None
@@ -462,11 +762,13 @@ class AFS2(Serializable):
 		self.IdToInd = dict()
 
 	def update_offsets(self):
-		self.tobytes()
+		self.calcsize()
 
-	def write_right(self, path):
+	def write_right(self, path, digest=None):
 		self.update_offsets()
-		self.write(path)
+		writer = Writer()
+		with writer.FileIO(path, digest) as rw:
+			rw.rw_obj(self)
 
 	def check_equal(self, afs2):
 		assert isinstance(afs2, AFS2)
@@ -515,34 +817,11 @@ class AFS2(Serializable):
 
 		with EndiannessManager(rw, "<"):
 
-			start = rw.tell()
-
-			self.Magic = rw.rw_string(self.Magic, 4, encoding="ascii")
-			if rw.is_parselike: # writer
-				self.Magic = self.Magic.decode()
-			assert self.Magic == "AFS2"
-
-			self.Type = rw.rw_uint8(self.Type)
-			self.PositionFieldLength = rw.rw_uint8(self.PositionFieldLength)
-			self.IdFieldLength = rw.rw_uint8(self.IdFieldLength)
-			self.Padding = rw.rw_uint8(self.Padding)
-
-			self.EntryCount = rw.rw_uint32(self.EntryCount)
-			self.Align = rw.rw_uint16(self.Align)
-			self.Key = rw.rw_uint16(self.Key)
-			assert self.Align == 32
-
-			self.EntryIds = rw.rw_objs(self.EntryIds, AfsValue, self.EntryCount, self.IdFieldLength)
-			self.EntryPositions = rw.rw_objs(self.EntryPositions, AfsValue, self.EntryCount, self.PositionFieldLength)
-
-			self.EndPosition = rw.rw_obj(self.EndPosition, AfsValue, self.PositionFieldLength)
+			self.rw_header(rw)
 
 			if rw.is_constructlike:
 				assert rw.tell() == self.EntryPositions[0].Value
 
-			for i in range(self.EntryCount):
-				self.IdToInd[self.EntryIds[i].Value] = i
-
 			if rw.is_constructlike:
 				checkpoint = rw.tell()
 				rw.seek(self.EndPosition.Value-1, 0)
@@ -553,11 +832,47 @@ class AFS2(Serializable):
 			if notHeaderOnly:
 				self.get_entries(rw)
 
+	def rw_header(self, rw):
+
+		self.Magic = rw.rw_string(self.Magic, 4, encoding="ascii")
+		if rw.is_parselike: # writer
+			self.Magic = self.Magic.decode()
+		assert self.Magic == "AFS2"
+
+		self.Type = rw.rw_uint8(self.Type)
+		self.PositionFieldLength = rw.rw_uint8(self.PositionFieldLength)
+		self.IdFieldLength = rw.rw_uint8(self.IdFieldLength)
+		self.Padding = rw.rw_uint8(self.Padding)
+
+		self.EntryCount = rw.rw_uint32(self.EntryCount)
+		self.Align = rw.rw_uint16(self.Align)
+		self.Key = rw.rw_uint16(self.Key)
+		assert self.Align == 32
+
+		self.EntryIds = rw.rw_objs(self.EntryIds, AfsValue, self.EntryCount, self.IdFieldLength)
+		self.EntryPositions = rw.rw_objs(self.EntryPositions, AfsValue, self.EntryCount, self.PositionFieldLength)
+
+		self.EndPosition = rw.rw_obj(self.EndPosition, AfsValue, self.PositionFieldLength)
+
+		for i in range(self.EntryCount):
+			self.IdToInd[self.EntryIds[i].Value] = i
+
+	# none of these force a lazy entry to be read
+	def GetRawEntry(self, ind):
+		return list.__getitem__(self.EntryData, ind)
+
+	def GetEntryLength(self, ind):
+		return len(self.GetRawEntry(ind))
+
+	def GetEntryReference(self, ind):
+		entry = self.GetRawEntry(ind)
+		return entry if isinstance(entry, DeferredBytes) else None
+
 	def get_entries(self, rw):
 
 		if rw.is_constructlike: # reader
 			self.EntryPads = list()
-			self.EntryData = list()
+			self.EntryData = AfsEntryData()
 
 		for i in range(self.EntryCount):
 
@@ -584,19 +899,45 @@ class AFS2(Serializable):
 
 			if rw.is_parselike:
 				if i < self.EntryCount-1:
-					self.EntryPositions[i+1].Value = entryPosition + len(self.EntryData[i])
+					self.EntryPositions[i+1].Value = entryPosition + self.GetEntryLength(i)
 				else:
-					self.EndPosition.Value = entryPosition + len(self.EntryData[i])
+					self.EndPosition.Value = entryPosition + self.GetEntryLength(i)
 
 			if i < self.EntryCount-1:
 				nextEntryPosition = self.EntryPositions[i+1].Value
 			else:
 				nextEntryPosition = self.EndPosition.Value
 
-			self.EntryData[i] = rw.rw_bytestring(self.EntryData[i], nextEntryPosition-entryPosition)
+			if self.Lazy or rw.is_parselike:
+				# writing also goes through here so that lazy entries are streamed out without being kept
+				self.EntryData[i] = rw.rw_deferred_bytestring(self.GetRawEntry(i), nextEntryPosition-entryPosition)
+			else:
+				self.EntryData[i] = rw.rw_bytestring(self.EntryData[i], nextEntryPosition-entryPosition)
 
 			assert rw.tell() == nextEntryPosition
-			assert nextEntryPosition-entryPosition == len(self.EntryData[i])
+			assert nextEntryPosition-entryPosition == self.GetEntryLength(i)
+
+
+def IsDirtyData(refData):
+	if refData.Pending is not None:
+		return False
+	if isinstance(refData.Value, UTF):
+		return refData.Value.IsDirty()
+	return isinstance(refData.Value, AFS2)
+
+
+class AfsEntryData(list):
+
+	# entries may be stored as DeferredBytes references into the source file,
+	# which are only read when indexed
+	def __getitem__(self, ind):
+		if isinstance(ind, slice):
+			return [load_deferred(entry) for entry in super().__getitem__(ind)]
+		return load_deferred(super().__getitem__(ind))
+
+	def __iter__(self):
+		for entry in super().__iter__():
+			yield load_deferred(entry)
 
 
 class AfsValue(Serializable):
@@ -636,3 +977,44 @@ class TypeFlag(Enum):
 	String		= 10
 	Data		= 11
 	GUID		= 12
+
+
+# array/struct typecodes for the numeric column types
+ColumnTypes = {
+	TypeFlag.UInt8:		"B",
+	TypeFlag.Int8:		"b",
+	TypeFlag.UInt16:	"H",
+	TypeFlag.Int16:		"h",
+	TypeFlag.UInt32:	"I",
+	TypeFlag.Int32:		"i",
+	TypeFlag.UInt64:	"Q",
+	TypeFlag.Int64:		"q",
+	TypeFlag.Single:	"f",
+	TypeFlag.Double:	"d",
+}
+
+
+def StringEncoding(encodingType):
+	if EncodingType(encodingType) == EncodingType.Utf8:
+		return "utf-8"
+	elif EncodingType(encodingType) == EncodingType.ShiftJis:
+		return "shift-jis"
+
+
+def RowStructFormat(typeFlags):
+	rowFormat = ""
+	for typeFlag in typeFlags:
+		if TypeFlag(typeFlag) == TypeFlag.String:
+			rowFormat += "I"
+		elif TypeFlag(typeFlag) == TypeFlag.Data:
+			rowFormat += "II"
+		elif TypeFlag(typeFlag) == TypeFlag.GUID:
+			rowFormat += "16s"
+		else:
+			rowFormat += ColumnTypes[TypeFlag(typeFlag)]
+	return rowFormat
+
+
+@functools.lru_cache(maxsize=None)
+def RowStruct(typeFlags):
+	return struct.Struct(">" + RowStructFormat(typeFlags))
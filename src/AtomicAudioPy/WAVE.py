@@ -1,5 +1,12 @@
 
+import array
 import math
+import sys
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
 from exbip.Serializable import Serializable
 from exbip.BinaryTargets.Interface.Base import EndiannessManager
@@ -28,7 +35,7 @@ class WAVE(Serializable):
 		self.Data = None
 
 	def update_offsets(self):
-		self.tobytes()
+		self.calcsize()
 
 	def write_right(self, path):
 		self.update_offsets()
@@ -79,8 +86,6 @@ class WAVE(Serializable):
 			self.FormatSize = rw.tell() - formatStart
 		assert rw.tell() - formatStart == self.FormatSize
 
-		print(self.NumChannels, self.SampleRate, self.BitsPerSample)
-
 		self.DataMagic = rw.rw_string(self.DataMagic, 4)
 		if rw.is_parselike:
 			self.DataMagic = self.DataMagic.decode()
@@ -110,33 +115,34 @@ class WAVE(Serializable):
 			print(len(remainder), remainder)
 
 	def decode(self):
-		shortSamples = list()
 		if self.BitsPerSample == 8:
-			for sample in self.Data:
-				# hmmmm. i don't think this is right
-				shortSamples.append((sample << 8) ^ 0x8000)
+			# 8-bit PCM is unsigned, centered on 0x80
+			if numpy is not None:
+				return (numpy.frombuffer(bytes(self.Data), dtype=numpy.uint8).astype(numpy.int16) - 0x80) << 8
+			return array.array("h", [(sample - 0x80) << 8 for sample in self.Data])
 		elif self.BitsPerSample == 16:
-			for i in range(0, self.DataSize, 2):
-				unsigned = ((self.Data[i+1] << 8) + self.Data[i]) & 0xFFFF
-				signed = (unsigned ^ 0x8000) - 0x8000
-				shortSamples.append(signed)
+			if numpy is not None:
+				return numpy.frombuffer(bytes(self.Data), dtype="<i2").astype(numpy.int16)
+			shortSamples = array.array("h", bytes(self.Data))
+			if sys.byteorder == "big":
+				shortSamples.byteswap()
+			return shortSamples
 		else:
 			raise ValueError("pls i only know how to do 8bit and 16bit TT_TT")
-		print(shortSamples[:64])
-		return shortSamples
 
 	def encode(self, shortSamples):
-		print(shortSamples[:64])
 		if self.BitsPerSample == 8:
-			byteSamples = [0]*len(shortSamples)
-			for i in range(len(shortSamples)):
-				byteSamples[i] = ((shortSamples[i] ^ 0x8000) >> 8) & 0xFF
-			self.Data = byteSamples
+			if numpy is not None:
+				self.Data = ((numpy.asarray(shortSamples, dtype=numpy.int16) >> 8) + 0x80).astype(numpy.uint8).tobytes()
+			else:
+				self.Data = bytes(((sample >> 8) + 0x80) for sample in shortSamples)
 		elif self.BitsPerSample == 16:
-			byteSamples = [0]*(2*len(shortSamples))
-			for i in range(len(shortSamples)):
-				byteSamples[2*i] = shortSamples[i] & 0xFF
-				byteSamples[2*i + 1] = (shortSamples[i] >> 8) & 0xFF
-			self.Data = byteSamples
+			if numpy is not None:
+				self.Data = numpy.asarray(shortSamples, dtype=numpy.int16).astype("<i2").tobytes()
+			else:
+				shortSamples = array.array("h", shortSamples)
+				if sys.byteorder == "big":
+					shortSamples.byteswap()
+				self.Data = shortSamples.tobytes()
 		else:
 			raise ValueError("pls i only know how to do 8bit and 16bit TT_TT")
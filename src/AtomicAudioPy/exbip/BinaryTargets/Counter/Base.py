@@ -1,11 +1,43 @@
+import os
 from ..Interface import IParseTarget
 from ..Interface import ISequentialStreamTarget
 
 
 class CounterBase(IParseTarget, ISequentialStreamTarget):
+    """
+    A parse target that only keeps track of where each value would be written,
+    so that offsets and sizes can be worked out without producing any bytes.
+    """
     def __init__(self):
         super().__init__()
         self.offset = 0
+        self.size = 0
 
-    def _raw_untyped(self, value, length):
+    def global_tell(self):
+        return self.offset
+
+    def global_seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            self.offset = offset
+        elif whence == os.SEEK_CUR:
+            self.offset += offset
+        elif whence == os.SEEK_END:
+            self.offset = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        return self.offset
+
+    def _advance(self, length):
         self.offset += length
+        if self.offset > self.size:
+            self.size = self.offset
+        return length
+
+    def _rw_raw(self, value, length):
+        # Mirror the Writer, which writes out whatever it's handed
+        if value is not None:
+            length = memoryview(value).nbytes
+        return self._advance(length)
+
+    def _rw_deferred(self, value, length):
+        return self._advance(len(value))
@@ -1,4 +1,4 @@
-from ...Descriptors import STANDARD_DESCRIPTORS
+from ...Descriptors import STANDARD_DESCRIPTORS, COUNTING_DESCRIPTORS
 from .Base import CounterBase
 
-Counter = CounterBase.extended_with(*STANDARD_DESCRIPTORS)
+Counter = CounterBase.extended_with(*STANDARD_DESCRIPTORS, *COUNTING_DESCRIPTORS)
@@ -1,6 +1,7 @@
 import enum
 import functools
 import os
+from ...Utilities.Deferred import load_deferred
 
 
 class OperatorType(enum.Enum):
@@ -90,6 +91,13 @@ class IBinaryTarget:
         """
         return NotImplementedError
 
+    def _rw_deferred(self, value, length):
+        """
+        Performs _rw_raw on a value that may be a DeferredBytes reference.
+        Targets that can consume the reference without loading it should override this.
+        """
+        return self._rw_raw(load_deferred(value), length)
+
     ####################
     # STREAM INTERFACE #
     ####################
@@ -0,0 +1,107 @@
+import mmap
+import os
+from ..Interface import IConstructTarget
+from ..Interface import ISequentialStreamTarget
+from ...Utilities.Deferred import BufferSource
+
+
+class MmapIO:
+    def __init__(self, rw, filepath):
+        self.rw = rw
+        self.filepath = filepath
+        self.mapping = None
+
+    def __enter__(self):
+        with open(self.filepath, 'rb') as F:
+            if os.fstat(F.fileno()).st_size:
+                self.mapping = mmap.mmap(F.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.mapping = b''
+        self.rw._open_view(self.mapping, self.filepath)
+        return self.rw
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.rw._close_view()
+        # Slices handed out by _rw_raw (or deferred reads) keep the mapping
+        # alive; in that case it is unmapped once the last of them is
+        # garbage-collected.
+        if isinstance(self.mapping, mmap.mmap):
+            try:
+                self.mapping.close()
+            except BufferError:
+                pass
+        self.mapping = None
+
+
+class BufferIO:
+    def __init__(self, rw, buffer):
+        self.rw = rw
+        self.buffer = buffer
+
+    def __enter__(self):
+        self.rw._open_view(self.buffer)
+        return self.rw
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.rw._close_view()
+
+
+class MappedReaderBase(IConstructTarget, ISequentialStreamTarget):
+    def __init__(self):
+        super().__init__()
+        self._view = None
+        self._source = None
+        self._pos = 0
+
+    def _open_view(self, buffer, filepath=None):
+        self._view = memoryview(buffer).cast('B')
+        self._source = BufferSource(buffer, filepath)
+        self._pos = 0
+
+    def _close_view(self):
+        self._view.release()
+        self._view = None
+        self._source = None
+        self._pos = 0
+
+    def global_tell(self):
+        return self._pos
+
+    def global_seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            pos = offset
+        elif whence == os.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == os.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence '{whence}'")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return self._pos
+
+    ##################################
+    # MAPPED-READER-SPECIFIC METHODS #
+    ##################################
+    def MmapIO(self, filepath):
+        return MmapIO(self, filepath)
+
+    def BufferIO(self, buffer):
+        return BufferIO(self, buffer)
+
+    # So that code written against the standard Reader can swap targets
+    def FileIO(self, filepath):
+        return MmapIO(self, filepath)
+
+    def BytestreamIO(self, initializer):
+        return BufferIO(self, initializer)
+
+    def _rw_raw(self, value, length):
+        start = self._pos
+        view = self._view[start:start+length]
+        self._pos = start + len(view)
+        return view
+
+    def peek_bytestream(self, length):
+        return self._view[self._pos:self._pos+length]
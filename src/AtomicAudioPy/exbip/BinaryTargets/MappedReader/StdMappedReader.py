@@ -0,0 +1,4 @@
+from ...Descriptors import STANDARD_DESCRIPTORS
+from .Base import MappedReaderBase
+
+MappedReader = MappedReaderBase.extended_with(*STANDARD_DESCRIPTORS)
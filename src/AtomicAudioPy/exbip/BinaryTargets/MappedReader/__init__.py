@@ -0,0 +1,2 @@
+from .Base import MappedReaderBase
+from .StdMappedReader import MappedReader
@@ -2,6 +2,7 @@ import io
 import os
 from ..Interface import IConstructTarget
 from ..Interface import ISequentialStreamTarget
+from ...Utilities.Deferred import FileSource, BufferSource
 
 
 class FileIO:
@@ -11,11 +12,13 @@ class FileIO:
 
     def __enter__(self):
         self.rw._bytestream = open(self.filepath, 'rb')
+        self.rw._source = FileSource(self.filepath)
         return self.rw
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.rw._bytestream.close()
         self.rw._bytestream = None
+        self.rw._source = None
 
 
 class SSOIO:
@@ -26,10 +29,12 @@ class SSOIO:
     def __enter__(self):
         with open(self.filepath, 'rb', buffering=0) as F:
             self.rw._bytestream = io.BytesIO(F.read())
+        self.rw._source = FileSource(self.filepath)
         return self.rw
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.rw._bytestream = None
+        self.rw._source = None
 
 
 class BytestreamIO:
@@ -39,17 +44,20 @@ class BytestreamIO:
 
     def __enter__(self):
         self.rw._bytestream = io.BytesIO(self.initializer)
+        self.rw._source = BufferSource(self.initializer)
         return self.rw
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.rw._bytestream.close()
         self.rw._bytestream = None
+        self.rw._source = None
 
 
 class ReaderBase(IConstructTarget, ISequentialStreamTarget):
     def __init__(self):
         super().__init__()
         self._bytestream = None
+        self._source = None
 
     def global_tell(self):
         return self._bytestream.tell()
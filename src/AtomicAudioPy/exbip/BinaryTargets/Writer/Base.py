@@ -1,21 +1,139 @@
 import io
 import os
+import secrets
+import stat
 from ..Interface import IParseTarget
 from ..Interface import ISequentialStreamTarget
+from ...Utilities.Deferred import DeferredBytes, FileSource, sources_holding
+
+
+class HashingStream:
+    """
+    Wraps a writable stream so that everything written through it is also fed
+    to a hashlib-style digest. The wrapped stream may be None to hash without
+    writing anything. Writes must be sequential, since a digest cannot be
+    rewound to account for overwritten data.
+    """
+    def __init__(self, stream, digest):
+        self.stream = stream
+        self.digest = digest
+        self.position = 0
+        self.hashed = 0
+
+    def write(self, data):
+        if self.position != self.hashed:
+            raise ValueError(f"Cannot hash a write at offset {self.position}: {self.hashed} bytes have already been hashed and writes must be sequential")
+        self.digest.update(data)
+        if self.stream is not None:
+            self.stream.write(data)
+        self.position += memoryview(data).nbytes
+        self.hashed = self.position
+        return memoryview(data).nbytes
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self.position + offset
+        elif whence == os.SEEK_END:
+            position = self.hashed + offset
+        else:
+            raise ValueError(f"Invalid whence ({whence})")
+        if self.stream is not None:
+            self.stream.seek(position)
+        self.position = position
+        return self.position
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def fileno(self):
+        # Everything has to pass through write() to be hashed, so kernel copies are off the table
+        raise io.UnsupportedOperation("fileno")
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+
+
+class ReplacementFile:
+    """
+    Opens a temporary file next to the target and moves it over the target
+    once it has been written. The target is never truncated, so anything that
+    still reads from it (a mapping, or deferred entries copied out of it while
+    the new file is written) keeps seeing the old contents. Nothing is replaced
+    if writing fails.
+
+    Windows won't replace a file that is still open or mapped, so sources that
+    hold the old file are let go of first. Deferred entries that were written
+    out are pointed at the same bytes in the new file; a mapping that is still
+    in use there means the file can't be replaced at all.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.temppath = None
+        self.file = None
+
+    def open(self):
+        directory, name = os.path.split(os.path.abspath(self.filepath))
+        while True:
+            self.temppath = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+            try:
+                self.file = open(self.temppath, 'xb')
+                break
+            except FileExistsError:
+                pass
+        try:
+            os.chmod(self.temppath, stat.S_IMODE(os.stat(self.filepath).st_mode))
+        except FileNotFoundError:
+            pass
+        return self.file
+
+    def close(self, commit=True, written=()):
+        self.file.close()
+        if not commit:
+            os.remove(self.temppath)
+            return
+        holding = sources_holding(self.filepath)
+        if os.name == "nt" and any(source.mapped for source in holding):
+            os.remove(self.temppath)
+            raise PermissionError(f"Cannot replace '{self.filepath}' while it is mapped; read it without mapping to write over it")
+        for source in holding:
+            source.release()
+        os.replace(self.temppath, self.filepath)
+        if holding and written:
+            replacement = FileSource(self.filepath)
+            for value, offset in written:
+                if any(value.source is source for source in holding):
+                    value.source = replacement
+                    value.offset = offset
 
 
 class FileIO:
-    def __init__(self, rw, filepath):
+    def __init__(self, rw, filepath, digest=None):
         self.rw = rw
         self.filepath = filepath
+        self.digest = digest
+        self.target = None
 
     def __enter__(self):
-        self.rw._bytestream = open(self.filepath, 'wb')
+        self.target = ReplacementFile(self.filepath)
+        self.rw._bytestream = self.target.open()
+        self.rw._written = []
+        if self.digest is not None:
+            self.rw._bytestream = HashingStream(self.rw._bytestream, self.digest)
         return self.rw
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.rw._bytestream.close()
+        written = self.rw._written
         self.rw._bytestream = None
+        self.rw._written = None
+        self.target.close(commit=exc_type is None, written=written)
+        self.target = None
 
 
 class SSOIO:
@@ -25,12 +143,21 @@ class SSOIO:
 
     def __enter__(self):
         self.rw._bytestream = io.BytesIO()
+        self.rw._written = []
         return self.rw
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.rw._bytestream.seek(0)
-        with open(self.filepath, 'wb') as F:
-            F.write(self.rw._bytestream.read())
+        written = self.rw._written
+        self.rw._written = None
+        if exc_type is None:
+            self.rw._bytestream.seek(0)
+            target = ReplacementFile(self.filepath)
+            try:
+                target.open().write(self.rw._bytestream.read())
+            except BaseException:
+                target.close(commit=False)
+                raise
+            target.close(written=written)
         self.rw._bytestream = None
 
 
@@ -47,10 +174,25 @@ class BytestreamIO:
         self.rw._bytestream = None
 
 
+class HashIO:
+    def __init__(self, rw, digest):
+        self.rw = rw
+        self.digest = digest
+
+    def __enter__(self):
+        self.rw._bytestream = HashingStream(None, self.digest)
+        return self.rw
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.rw._bytestream = None
+
+
 class WriterBase(IParseTarget, ISequentialStreamTarget):
     def __init__(self):
         super().__init__()
         self._bytestream = None
+        # deferred entries copied out while writing to a file, and where they went
+        self._written = None
 
     def global_tell(self):
         return self._bytestream.tell()
@@ -58,8 +200,8 @@ class WriterBase(IParseTarget, ISequentialStreamTarget):
     def global_seek(self, offset, whence=os.SEEK_SET):
         return self._bytestream.seek(offset, whence)
 
-    def FileIO(self, filepath):
-        return FileIO(self, filepath)
+    def FileIO(self, filepath, digest=None):
+        return FileIO(self, filepath, digest)
 
     def SSOIO(self, filepath):
         return SSOIO(self, filepath)
@@ -67,5 +209,17 @@ class WriterBase(IParseTarget, ISequentialStreamTarget):
     def BytestreamIO(self):
         return BytestreamIO(self)
 
+    def HashIO(self, digest):
+        return HashIO(self, digest)
+
     def _rw_raw(self, value, length):
         return self._bytestream.write(value)
+
+    def _rw_deferred(self, value, length):
+        if isinstance(value, DeferredBytes):
+            offset = self._bytestream.tell()
+            value.copy_to(self._bytestream)
+            if self._written is not None:
+                self._written.append((value, offset))
+            return length
+        return self._rw_raw(value, length)
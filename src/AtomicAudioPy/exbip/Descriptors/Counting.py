@@ -0,0 +1,53 @@
+from ..Utilities.List import flatten_list, standardize_shape
+
+
+# Replacements for the Core descriptors on targets that only need sizes:
+# values are never packed, so counting costs nothing per byte of payload.
+
+
+class CountingTypedDescriptor:
+    FUNCTION_NAME = "_rw_typed"
+
+    @staticmethod
+    def construct(binary_target, value, typecode, size, endianness):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(binary_target, value, typecode, size, endianness):
+        binary_target._rw_raw(None, size)
+        return value
+
+
+class CountingTypedsDescriptor:
+    FUNCTION_NAME = "_rw_typeds"
+
+    @staticmethod
+    def construct(binary_target, value, typecode, size, shape, endianness):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(binary_target, value, typecode, size, shape, endianness):
+        element_count = len(flatten_list(value, standardize_shape(shape)))
+        binary_target._rw_raw(None, size*element_count)
+        return value
+
+
+class CountingTypedArrayDescriptor:
+    FUNCTION_NAME = "_rw_typedarray"
+
+    @staticmethod
+    def construct(binary_target, value, typecode, size, shape, endianness):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(binary_target, value, typecode, size, shape, endianness):
+        element_count = len(flatten_list(value, standardize_shape(shape)))
+        binary_target._rw_raw(None, size * element_count)
+        return value
+
+
+COUNTING_DESCRIPTORS = [
+    CountingTypedDescriptor,
+    CountingTypedsDescriptor,
+    CountingTypedArrayDescriptor
+]
@@ -0,0 +1,17 @@
+import os
+from ..Utilities.Deferred import DeferredBytes
+
+
+class DeferredBytestringDescriptor:
+    FUNCTION_NAME = "rw_deferred_bytestring"
+
+    @staticmethod
+    def construct(binary_target, value, length):
+        value = DeferredBytes(binary_target._source, binary_target.global_tell(), length)
+        binary_target.seek(length, os.SEEK_CUR)
+        return value
+
+    @staticmethod
+    def parse(binary_target, value, length):
+        binary_target._rw_deferred(value, length)
+        return value
@@ -15,7 +15,7 @@ class StringDescriptor:
 
     @staticmethod
     def construct(binary_target, value, length, encoding="ascii"):
-        return binary_target._rw_untyped(value, length).decode(encoding)
+        return bytes(binary_target._rw_untyped(value, length)).decode(encoding)
 
     @staticmethod
     def parse(binary_target, value, length, encoding="ascii"):
@@ -5,6 +5,8 @@ from .Primitives import PRIMITIVE_DESCRIPTORS, PRIMITIVE_ARRAY_DESCRIPTORS
 from .StreamHandlers import AssertEOFDescriptor, AlignmentDescriptor
 from .String import BytestringDescriptor, CBytestringDescriptor, StringDescriptor, CStringDescriptor
 from .Union import UnionDescriptor
+from .Deferred import DeferredBytestringDescriptor
+from .Counting import COUNTING_DESCRIPTORS
 
 
 STANDARD_DESCRIPTORS = [
@@ -24,5 +26,6 @@ STANDARD_DESCRIPTORS = [
     CBytestringDescriptor,
     StringDescriptor,
     CStringDescriptor,
-    UnionDescriptor
+    UnionDescriptor,
+    DeferredBytestringDescriptor
 ]
@@ -1,9 +1,15 @@
 from .Traits import ReadableTrait
+from .Traits import MappedReadableTrait
 from .Traits import WriteableTrait
+from .Traits import CountableTrait
 from ..BinaryTargets.Reader import Reader
+from ..BinaryTargets.MappedReader import MappedReader
 from ..BinaryTargets.Writer import Writer
+from ..BinaryTargets.Counter import Counter
 
 
 class Serializable(ReadableTrait(Reader),
-                   WriteableTrait(Writer)):
+                   MappedReadableTrait(MappedReader),
+                   WriteableTrait(Writer),
+                   CountableTrait(Counter)):
     pass
@@ -13,6 +13,21 @@ def ReadableTrait(Reader):
     return ReadableTraitImpl
 
 
+def MappedReadableTrait(MappedReader):
+    class MappedReadableTraitImpl:
+        def read_mapped(self, filepath, *args, **kwargs):
+            reader = MappedReader()
+            with reader.MmapIO(filepath) as rw:
+                rw.rw_obj(self, *args, **kwargs)
+
+        def frombuffer(self, buffer, *args, **kwargs):
+            reader = MappedReader()
+            with reader.BufferIO(buffer):
+                reader.rw_obj(self, *args, **kwargs)
+
+    return MappedReadableTraitImpl
+
+
 def WriteableTrait(Writer):
     class WriteableTraitImpl:
         def write(self, filepath, *args, **kwargs):
@@ -28,5 +43,20 @@ def WriteableTrait(Writer):
                 writer.seek(0)
                 return writer._bytestream.read()
 
+        def todigest(self, digest, *args, **kwargs):
+            writer = Writer()
+            with writer.HashIO(digest):
+                writer.rw_obj(self, *args, **kwargs)
+            return digest
+
     return WriteableTraitImpl
 
+
+def CountableTrait(Counter):
+    class CountableTraitImpl:
+        def calcsize(self, *args, **kwargs):
+            counter = Counter()
+            counter.rw_obj(self, *args, **kwargs)
+            return counter.size
+
+    return CountableTraitImpl
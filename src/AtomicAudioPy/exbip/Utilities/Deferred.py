@@ -0,0 +1,181 @@
+import io
+import os
+import weakref
+
+
+COPY_CHUNK_SIZE = 1 << 20
+
+
+def _kernel_copy(src_fd, dst_fd, src_offset, dst_offset, length):
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < length:
+                n = os.copy_file_range(src_fd, dst_fd, length - copied, src_offset + copied, dst_offset + copied)
+                if not n:
+                    break
+                copied += n
+            return copied
+        except OSError:
+            pass
+    if hasattr(os, "sendfile"):
+        try:
+            os.lseek(dst_fd, dst_offset + copied, os.SEEK_SET)
+            while copied < length:
+                n = os.sendfile(dst_fd, src_fd, src_offset + copied, length - copied)
+                if not n:
+                    break
+                copied += n
+        except OSError:
+            pass
+    return copied
+
+
+def copy_file_slice(src_file, offset, length, dst_file):
+    """
+    Copies a slice of an open file into an open writable file at its current position,
+    in the kernel where the platform allows it and in bounded chunks otherwise.
+    """
+    try:
+        dst_fd = dst_file.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        dst_fd = None
+
+    dst_pos = dst_file.tell()
+    copied = 0
+    if dst_fd is not None:
+        dst_file.flush()
+        copied = _kernel_copy(src_file.fileno(), dst_fd, offset, dst_pos, length)
+        dst_file.seek(dst_pos + copied)
+    src_file.seek(offset + copied)
+    while copied < length:
+        chunk = src_file.read(min(COPY_CHUNK_SIZE, length - copied))
+        if not chunk:
+            raise EOFError(f"Expected {length} bytes at offset {offset} of '{src_file.name}', but only {copied} were available")
+        dst_file.write(chunk)
+        copied += len(chunk)
+
+
+def open_source_file(filepath):
+    # Held open for as long as anything defers to it, so that the data stays
+    # readable after the path has been replaced with a newly written file
+    return open(filepath, 'rb')
+
+
+def current_filepath(filepath, file):
+    """
+    The path of a source file if it still names the file that was opened, else None.
+    """
+    if filepath is None or file is None:
+        return None
+    try:
+        return filepath if os.path.samestat(os.fstat(file.fileno()), os.stat(filepath)) else None
+    except OSError:
+        return None
+
+
+# every source that holds a file open, so that the file can be let go of before it is replaced
+_open_sources = weakref.WeakSet()
+
+
+def sources_holding(filepath):
+    """
+    The sources that hold the file at a path open.
+    """
+    try:
+        target = os.stat(filepath)
+    except FileNotFoundError:
+        return []
+    return [source for source in list(_open_sources) if source.file is not None and os.path.samestat(os.fstat(source.file.fileno()), target)]
+
+
+class FileSource:
+    __slots__ = ("filepath", "file", "__weakref__")
+
+    mapped = False
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.file = open_source_file(filepath)
+        _open_sources.add(self)
+
+    def read(self, offset, length):
+        if self.file is None:
+            raise ValueError(f"'{self.filepath}' has been replaced since this was read from it")
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def copy_to(self, offset, length, dst_file):
+        if self.file is None:
+            raise ValueError(f"'{self.filepath}' has been replaced since this was read from it")
+        copy_file_slice(self.file, offset, length, dst_file)
+
+    def current_filepath(self):
+        return current_filepath(self.filepath, self.file)
+
+    def release(self):
+        self.file.close()
+        self.file = None
+
+
+class BufferSource:
+    __slots__ = ("view", "filepath", "file", "__weakref__")
+
+    def __init__(self, buffer, filepath=None):
+        self.view = memoryview(buffer).cast('B')
+        # If the buffer is a mapping of a file, copies can skip the mapping
+        self.filepath = filepath
+        self.file = None if filepath is None else open_source_file(filepath)
+        if self.file is not None:
+            _open_sources.add(self)
+
+    @property
+    def mapped(self):
+        return self.filepath is not None
+
+    def read(self, offset, length):
+        return self.view[offset:offset+length]
+
+    def copy_to(self, offset, length, dst_file):
+        if self.file is None:
+            dst_file.write(self.read(offset, length))
+        else:
+            copy_file_slice(self.file, offset, length, dst_file)
+
+    def current_filepath(self):
+        return current_filepath(self.filepath, self.file)
+
+    def release(self):
+        # The mapping itself stays readable wherever the platform lets the file be replaced under it
+        self.file.close()
+        self.file = None
+
+
+class DeferredBytes:
+    __slots__ = ("source", "offset", "length")
+
+    def __init__(self, source, offset, length):
+        self.source = source
+        self.offset = offset
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return f"DeferredBytes(offset={self.offset}, length={self.length})"
+
+    def load(self):
+        data = self.source.read(self.offset, self.length)
+        if len(data) != self.length:
+            raise EOFError(f"Expected {self.length} bytes at offset {self.offset}, but only {len(data)} were available")
+        return data
+
+    def copy_to(self, dst_file):
+        self.source.copy_to(self.offset, self.length, dst_file)
+
+
+def load_deferred(value):
+    if isinstance(value, DeferredBytes):
+        return value.load()
+    return value
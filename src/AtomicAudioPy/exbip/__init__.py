@@ -1,2 +1,4 @@
 from .BinaryTargets.Reader import ReaderBase, Reader
+from .BinaryTargets.MappedReader import MappedReaderBase, MappedReader
 from .BinaryTargets.Writer import WriterBase, Writer
+from .BinaryTargets.Counter import CounterBase, Counter
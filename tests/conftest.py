@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules import each other by bare name, the same way AtomicAudioTool.py runs them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "AtomicAudioPy"))
@@ -0,0 +1,55 @@
+import os
+import wave
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from HCA import HCA
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def read_hca(name):
+	hca = HCA()
+	with open(os.path.join(DATA, name), "rb") as f:
+		hca.frombytes(f.read())
+	return hca
+
+
+def read_pcm(name):
+	with wave.open(os.path.join(DATA, name), "rb") as f:
+		return numpy.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+
+
+def test_decode_matches_reference():
+	# stereo.hca comes from CRI's encoder and uses HFR and intensity stereo; stereo.wav is CRI's decode of it
+	pcm = read_hca("stereo.hca").decode()
+	reference = read_pcm("stereo.wav")
+	assert len(pcm) == len(reference)
+	assert numpy.abs(pcm.astype(numpy.int32) - reference).max() <= 1
+
+
+def test_decode_ath_curve_matches_reference():
+	# a version 1.3 file without an ath chunk, so it uses the ATH curve; ath.wav is CRI's decode of it
+	hca = read_hca("ath.hca")
+	assert hca.Header.Version < 0x200 and hca.Header.AthChunk is None
+	pcm = hca.decode()
+	reference = read_pcm("ath.wav")
+	assert len(pcm) == len(reference)
+	assert numpy.abs(pcm.astype(numpy.int32) - reference).max() <= 1
+
+
+def test_encode_keeps_level():
+	# the decoder is checked against CRI's above, so a scale error in the encoder shows up here
+	t = numpy.arange(44100) / 44100
+	pcm = numpy.rint(2000 * numpy.sin(2 * numpy.pi * 440 * t)).astype(numpy.int16)
+	hca = HCA(1, 44100)
+	hca.encode(pcm)
+	decoded = HCA()
+	decoded.frombytes(hca.tobytes())
+	decoded.VerifyFrames()
+	out = decoded.decode().astype(numpy.float64)
+	assert len(out) == len(pcm)
+	gain = (out @ pcm) / (pcm.astype(numpy.float64) @ pcm)
+	assert abs(gain - 1) < 0.01